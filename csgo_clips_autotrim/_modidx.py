@@ -8,15 +8,133 @@ d = { 'settings': { 'branch': '{branch}',
   'syms': { 'csgo_clips_autotrim.core': {'csgo_clips_autotrim.core.say_hello': ('core.html#say_hello', 'csgo_clips_autotrim/core.py')},
             'csgo_clips_autotrim.feature_extraction': { 'csgo_clips_autotrim.feature_extraction.ColorSpace': ( 'feature_extraction_experiments.html#colorspace',
                                                                                                                'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.Crop': ( 'feature_extraction_experiments.html#crop',
+                                                                                                         'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.DecodeBackend': ( 'feature_extraction_experiments.html#decodebackend',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.DecodedFrame': ( 'feature_extraction_experiments.html#decodedframe',
+                                                                                                                 'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.DownsampleConfig': ( 'feature_extraction_experiments.html#downsampleconfig',
                                                                                                                      'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.DownsampleConfig.__str__': ( 'feature_extraction_experiments.html#downsampleconfig.__str__',
                                                                                                                              'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.DownsampleConfig.from_str': ( 'feature_extraction_experiments.html#downsampleconfig.from_str',
                                                                                                                               'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore': ( 'feature_extraction_experiments.html#framestore',
+                                                                                                               'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.__contains__': ( 'feature_extraction_experiments.html#framestore.__contains__',
+                                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.__init__': ( 'feature_extraction_experiments.html#framestore.__init__',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.__len__': ( 'feature_extraction_experiments.html#framestore.__len__',
+                                                                                                                       'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.array': ( 'feature_extraction_experiments.html#framestore.array',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.exists': ( 'feature_extraction_experiments.html#framestore.exists',
+                                                                                                                      'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStore.get': ( 'feature_extraction_experiments.html#framestore.get',
+                                                                                                                   'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreIndex': ( 'feature_extraction_experiments.html#framestoreindex',
+                                                                                                                    'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter': ( 'feature_extraction_experiments.html#framestorewriter',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter.__enter__': ( 'feature_extraction_experiments.html#framestorewriter.__enter__',
+                                                                                                                               'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter.__exit__': ( 'feature_extraction_experiments.html#framestorewriter.__exit__',
+                                                                                                                              'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter.__init__': ( 'feature_extraction_experiments.html#framestorewriter.__init__',
+                                                                                                                              'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter.append': ( 'feature_extraction_experiments.html#framestorewriter.append',
+                                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.FrameStoreWriter.close': ( 'feature_extraction_experiments.html#framestorewriter.close',
+                                                                                                                           'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.Roi': ( 'feature_extraction_experiments.html#roi',
+                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.Roi.to_pixels': ( 'feature_extraction_experiments.html#roi.to_pixels',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.SamplingStrategy': ( 'feature_extraction_experiments.html#samplingstrategy',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.VideoMetadata': ( 'feature_extraction_experiments.html#videometadata',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._PrefetchError': ( 'feature_extraction_experiments.html#_prefetcherror',
+                                                                                                                   'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._PrefetchError.__init__': ( 'feature_extraction_experiments.html#_prefetcherror.__init__',
+                                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._decode_shard': ( 'feature_extraction_experiments.html#_decode_shard',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_ffmpeg_output_shape': ( 'feature_extraction_experiments.html#_get_ffmpeg_output_shape',
+                                                                                                                             'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_ffmpeg_roi_stream': ( 'feature_extraction_experiments.html#_get_ffmpeg_roi_stream',
+                                                                                                                           'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_frame_store_data_path': ( 'feature_extraction_experiments.html#_get_frame_store_data_path',
+                                                                                                                               'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_roi_layout': ( 'feature_extraction_experiments.html#_get_roi_layout',
+                                                                                                                    'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_video_metadata': ( 'feature_extraction_experiments.html#_get_video_metadata',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._get_video_metadata_cache_path': ( 'feature_extraction_experiments.html#_get_video_metadata_cache_path',
+                                                                                                                                   'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._imread_rgb': ( 'feature_extraction_experiments.html#_imread_rgb',
+                                                                                                                'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._iter_ffmpeg_frames': ( 'feature_extraction_experiments.html#_iter_ffmpeg_frames',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._iter_opencv_frames': ( 'feature_extraction_experiments.html#_iter_opencv_frames',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._iter_parallel_frames': ( 'feature_extraction_experiments.html#_iter_parallel_frames',
+                                                                                                                          'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._open_frame_store': ( 'feature_extraction_experiments.html#_open_frame_store',
+                                                                                                                      'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._parse_rate': ( 'feature_extraction_experiments.html#_parse_rate',
+                                                                                                                'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._read_stored': ( 'feature_extraction_experiments.html#_read_stored',
+                                                                                                                 'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._resize_frame': ( 'feature_extraction_experiments.html#_resize_frame',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction._to_decoded_frame': ( 'feature_extraction_experiments.html#_to_decoded_frame',
+                                                                                                                      'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.batched': ( 'feature_extraction_experiments.html#batched',
+                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.choose_sampling_strategy': ( 'feature_extraction_experiments.html#choose_sampling_strategy',
+                                                                                                                             'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.close_frame_stores': ( 'feature_extraction_experiments.html#close_frame_stores',
+                                                                                                                       'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.downsample_frame': ( 'feature_extraction_experiments.html#downsample_frame',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.downsample_frame_regions': ( 'feature_extraction_experiments.html#downsample_frame_regions',
+                                                                                                                             'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.get_downsampled_frames': ( 'feature_extraction_experiments.html#get_downsampled_frames',
                                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.get_keyframe_shards': ( 'feature_extraction_experiments.html#get_keyframe_shards',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.get_video_fps': ( 'feature_extraction_experiments.html#get_video_fps',
+                                                                                                                  'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.get_video_keyframe_interval': ( 'feature_extraction_experiments.html#get_video_keyframe_interval',
+                                                                                                                                'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.get_video_keyframes': ( 'feature_extraction_experiments.html#get_video_keyframes',
+                                                                                                                        'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.get_video_metadata': ( 'feature_extraction_experiments.html#get_video_metadata',
+                                                                                                                       'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.get_video_num_frames': ( 'feature_extraction_experiments.html#get_video_num_frames',
                                                                                                                          'csgo_clips_autotrim/feature_extraction.py'),
                                                         'csgo_clips_autotrim.feature_extraction.get_video_size': ( 'feature_extraction_experiments.html#get_video_size',
-                                                                                                                   'csgo_clips_autotrim/feature_extraction.py')}}}
+                                                                                                                   'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.iter_downsampled_frames': ( 'feature_extraction_experiments.html#iter_downsampled_frames',
+                                                                                                                            'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.list_frame_names': ( 'feature_extraction_experiments.html#list_frame_names',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.load_downsample_config': ( 'feature_extraction_experiments.html#load_downsample_config',
+                                                                                                                           'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.make_synthetic_video': ( 'feature_extraction_experiments.html#make_synthetic_video',
+                                                                                                                         'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.open_frame_store': ( 'feature_extraction_experiments.html#open_frame_store',
+                                                                                                                     'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.prefetch': ( 'feature_extraction_experiments.html#prefetch',
+                                                                                                             'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.probe_video': ( 'feature_extraction_experiments.html#probe_video',
+                                                                                                                'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.read_frame': ( 'feature_extraction_experiments.html#read_frame',
+                                                                                                               'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.read_frame_region': ( 'feature_extraction_experiments.html#read_frame_region',
+                                                                                                                      'csgo_clips_autotrim/feature_extraction.py'),
+                                                        'csgo_clips_autotrim.feature_extraction.save_downsample_config': ( 'feature_extraction_experiments.html#save_downsample_config',
+                                                                                                                           'csgo_clips_autotrim/feature_extraction.py')}}}
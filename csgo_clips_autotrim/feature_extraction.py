@@ -1,22 +1,28 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/feature_extraction_experiments.ipynb.
 
 # %% auto 0
-__all__ = ['logger', 'get_video_size', 'get_video_num_frames', 'ColorSpace', 'DownsampleConfig', 'get_downsampled_frames']
+__all__ = ['logger', 'VIDEO_METADATA_DIR_NAME', 'VideoMetadata', 'probe_video', 'get_video_metadata', 'get_video_size', 'get_video_num_frames', 'get_video_fps', 'get_video_keyframe_interval', 'KILLFEED_ROI', 'HUD_ROI', 'ROI_PRESETS', 'DEFAULT_ROIS', 'ColorSpace', 'Crop', 'Roi', 'DownsampleConfig', 'SamplingStrategy', 'choose_sampling_strategy', 'downsample_frame', 'downsample_frame_regions', 'DecodedFrame', 'prefetch', 'batched', 'DecodeBackend', 'get_video_keyframes', 'get_keyframe_shards', 'iter_downsampled_frames', 'get_downsampled_frames', 'FRAME_STORE_INDEX_FILE_NAME', 'FRAME_STORE_FRAME_KEY', 'FrameStoreIndex', 'FrameStoreWriter', 'FrameStore', 'open_frame_store', 'close_frame_stores', 'DOWNSAMPLE_CONFIG_FILE_NAME', 'save_downsample_config', 'load_downsample_config', 'list_frame_names', 'read_frame', 'read_frame_region', 'make_synthetic_video']
 
 # %% ../nbs/feature_extraction_experiments.ipynb 2
+import collections
+import concurrent.futures
+import functools
+import itertools
+import multiprocessing
 import os
+import pathlib
 import pickle
-from dataclasses import dataclass
+import queue
+import threading
+from dataclasses import dataclass, field
 import enum
 
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
 import cv2
 from dataclasses_json import dataclass_json
 import ffmpeg
-from IPython.display import Image
 import numpy as np
-import matplotlib.pyplot as plt
-from skimage.transform import resize
-import skvideo.io
 from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 
@@ -28,39 +34,177 @@ from experiment_utils.utils import getLogger
 logger = getLogger()
 
 # %% ../nbs/feature_extraction_experiments.ipynb 4
+VIDEO_METADATA_DIR_NAME = 'meta'
+
+@dataclass_json
+@dataclass
+class VideoMetadata:
+    """Metadata of the first video stream of a file."""
+    width: int
+    height: int
+    num_frames: int
+    fps: Optional[float]
+    duration: Optional[float]
+    codec: str
+    keyframe_interval: Optional[float]
+
+def _parse_rate(rate: str) -> Optional[float]:
+    num, den = (int(x) for x in rate.split('/'))
+
+    return num / den if den and num else None
+
+def probe_video(filename, num_packets: int = 1000) -> VideoMetadata:
+    """Probe a video with a single ffprobe call. The keyframe interval is
+    estimated from the keyframe flags of the first `num_packets` packets, only
+    packet headers are read, nothing is decoded.
+
+    Args:
+        filename
+        num_packets (int, optional): Defaults to 1000.
+
+    Returns:
+        VideoMetadata
+    """
+    logger.info('Probing {!r}'.format(filename))
+    probe = ffmpeg.probe(filename, select_streams='v:0', show_entries='packet=flags', read_intervals=f'%+#{num_packets}')
+    video_info = probe['streams'][0]
+
+    fps = _parse_rate(video_info.get('avg_frame_rate', '0/0'))
+    duration = video_info.get('duration', probe.get('format', {}).get('duration'))
+    duration = float(duration) if duration is not None else None
+
+    if 'nb_frames' in video_info:
+        num_frames = int(video_info['nb_frames'])
+    else:
+        # Some containers (e.g. mkv) do not store the frame count.
+        num_frames = int(round(duration * fps)) if duration and fps else 0
+
+    keyframes = [idx for idx, packet in enumerate(probe.get('packets', [])) if 'K' in packet.get('flags', '')]
+    keyframe_interval = (keyframes[-1] - keyframes[0]) / (len(keyframes) - 1) if len(keyframes) >= 2 else None
+
+    return VideoMetadata(width=int(video_info['width']),
+                         height=int(video_info['height']),
+                         num_frames=num_frames,
+                         fps=fps,
+                         duration=duration,
+                         codec=video_info.get('codec_name', ''),
+                         keyframe_interval=keyframe_interval)
+
+def _get_video_metadata_cache_path(filename) -> Optional[pathlib.Path]:
+    # The ingest stage stores the content hash of every video in `meta/<stem>.hash`.
+    path = pathlib.Path(filename)
+    hash_path = path.parent / VIDEO_METADATA_DIR_NAME / f'{path.stem}.hash'
+
+    if not hash_path.exists():
+        return None
+
+    return hash_path.parent / f'{hash_path.read_text().strip()}.probe.json'
+
+@functools.lru_cache(maxsize=64)
+def _get_video_metadata(filename: str, size: int, mtime_ns: int) -> VideoMetadata:
+    cache_path = _get_video_metadata_cache_path(filename)
+
+    if cache_path is not None and cache_path.exists():
+        return VideoMetadata.from_json(cache_path.read_text())
+
+    metadata = probe_video(filename)
+
+    if cache_path is not None:
+        try:
+            tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+            tmp_path.write_text(metadata.to_json())
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            logger.warning('Could not cache video metadata in %s', cache_path.as_posix())
+
+    return metadata
+
+def get_video_metadata(filename) -> VideoMetadata:
+    """Get the metadata of a video, probing it at most once. Results are cached
+    in memory and, for ingested videos, on disk next to the content hash in the
+    `meta/` directory (`meta/<hash>.probe.json`).
+
+    Args:
+        filename
+
+    Returns:
+        VideoMetadata
+    """
+    stat = os.stat(filename)
+
+    return _get_video_metadata(os.fspath(filename), stat.st_size, stat.st_mtime_ns)
+
 def get_video_size(filename):
-    logger.info('Getting video size for {!r}'.format(filename))
-    probe = ffmpeg.probe(filename)
-    video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-    width = int(video_info['width'])
-    height = int(video_info['height'])
-    
-    return width, height
+    metadata = get_video_metadata(filename)
+
+    return metadata.width, metadata.height
 
 def get_video_num_frames(filename):
-    logger.info('Getting video size for {!r}'.format(filename))
-    probe = ffmpeg.probe(filename)
-    video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-    
-    return int(video_info['nb_frames'])
+    return get_video_metadata(filename).num_frames
+
+def get_video_fps(filename) -> Optional[float]:
+    return get_video_metadata(filename).fps
+
+def get_video_keyframe_interval(filename) -> Optional[float]:
+    """Estimated GOP size (in frames) of the first video stream."""
+    return get_video_metadata(filename).keyframe_interval
 
 # %% ../nbs/feature_extraction_experiments.ipynb 6
 class ColorSpace(str, enum.Enum):
     RGB = "RGB"
     BW = "BW"
 
+class Crop(str, enum.Enum):
+    TOP_RIGHT = "TOPRIGHT"
+    ROI = "ROI"
+    NONE =  "NONE"
+
+@dataclass_json
+@dataclass
+class Roi:
+    """Region of interest of a frame.
+    NOTE: Dimensions are relative to the frame size, in [x, y, width, height] format.
+    """
+    name: str
+    x: float
+    y: float
+    width: float
+    height: float
+
+    def to_pixels(self, frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
+        """Get the [xmin, ymin, xmax, ymax] pixel box of this region in a frame of the given size."""
+        return (int(self.x * frame_width), int(self.y * frame_height),
+                int((self.x + self.width) * frame_width), int((self.y + self.height) * frame_height))
+
+# Top right quadrant, the input of the elimination and weapon segmentation models.
+KILLFEED_ROI = Roi('killfeed', 0.5, 0., 0.5, 0.5)
+# Top centre, with the team bars (eliminated teammate marks) and the round end banner used by the game state model.
+HUD_ROI = Roi('hud', 0.25, 0., 0.5, 0.4)
+
+ROI_PRESETS = {roi.name: roi for roi in (KILLFEED_ROI, HUD_ROI)}
+DEFAULT_ROIS = [KILLFEED_ROI, HUD_ROI]
+
+@dataclass_json
 @dataclass
 class DownsampleConfig:
     height: int
     width: int
     fps_ratio: int
     col_space: ColorSpace
+    crop: Crop
+    rois: List[Roi] = field(default_factory=list)
         
     __MAGIC = 'downsample_'
     
     def __str__(self):
-        return f'{self.__MAGIC}_{self.width}x{self.height}_{self.fps_ratio}_{self.col_space}'
-    
+        # The inverse of `from_str`.
+        repr = f'{self.__MAGIC}{self.width}x{self.height}_{self.fps_ratio}_{self.col_space.value}'
+        if self.crop == Crop.ROI:
+            repr += f'_{self.crop.value}-' + '+'.join(roi.name for roi in self.rois)
+        elif self.crop != Crop.NONE:
+            repr += f'_{self.crop.value}'
+        return repr
+
     @classmethod
     def from_str(cls, downsample_str: str):
         if downsample_str[:len(cls.__MAGIC)] != cls.__MAGIC:
@@ -70,43 +214,776 @@ class DownsampleConfig:
         fields = rest[0].split('_')
         
         height, fps_ratio, col_space, *rest = fields
+
+        crop = Crop.NONE
+        rois = []
+        if len(rest) > 0:
+            crop, *rest = rest
+            # Regions of interest are given by preset name, e.g. ROI-killfeed+hud.
+            crop, _, roi_names = crop.partition('-')
+            crop = Crop(crop)
+
+            if crop == Crop.ROI:
+                rois = [ROI_PRESETS[name] for name in roi_names.split('+')] if roi_names else list(DEFAULT_ROIS)
         
         return DownsampleConfig(height=int(height),
                                 width=int(width),
                                 fps_ratio=int(fps_ratio),
-                                col_space=ColorSpace(col_space))
+                                col_space=ColorSpace(col_space),
+                                crop=crop,
+                                rois=rois)
+
+# %% ../nbs/feature_extraction_experiments.ipynb 8
+class SamplingStrategy(str, enum.Enum):
+    AUTO = "AUTO"
+    GRAB = "GRAB"
+    SEEK = "SEEK"
+
+def choose_sampling_strategy(fps_ratio: int, keyframe_interval: Optional[float]) -> SamplingStrategy:
+    """Pick how to skip over the frames between two sampled frames.
+
+    Args:
+        fps_ratio (int): Sampling stride in frames.
+        keyframe_interval (Optional[float]): GOP size of the video, if known.
+
+    Returns:
+        SamplingStrategy: `GRAB` unless the stride is longer than a GOP.
+    """
+    if keyframe_interval is None or fps_ratio <= keyframe_interval:
+        return SamplingStrategy.GRAB
+
+    return SamplingStrategy.SEEK
+
+def _resize_frame(frame: np.array, height: int, width: int, col_space: ColorSpace) -> np.array:
+    # scikit-image is slow to import, and only needed to downsample.
+    from skimage.transform import resize
+
+    resized_image = resize(frame, (height, width))
+
+    if col_space == ColorSpace.BW:
+        rgb_weights = [0.2989, 0.5870, 0.1140]
+        grayscale_image = np.dot(resized_image[...,:3], rgb_weights)
+        return (grayscale_image * 255).astype(np.uint8)
+
+    return (resized_image * 255).astype(np.uint8)
+
+def downsample_frame(frame: np.array, downsample_config: DownsampleConfig) -> np.array:
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    int_frame = _resize_frame(frame, downsample_config.height, downsample_config.width, downsample_config.col_space)
+    
+    if downsample_config.crop == Crop.TOP_RIGHT:
+        height, width, channels = int_frame.shape
+        mid_height, mid_width = height // 2, width // 2
+        int_frame = int_frame[:mid_height, mid_width:, :]
+
+    return int_frame
+
+def downsample_frame_regions(frame: np.array, downsample_config: DownsampleConfig) -> Dict[str, np.array]:
+    """Resize and colour convert only the regions of interest of a decoded
+    (BGR) frame, the rest of the frame is never touched.
+
+    Args:
+        frame (np.array): Decoded frame at the source resolution.
+        downsample_config (DownsampleConfig)
 
-# %% ../nbs/feature_extraction_experiments.ipynb 7
-def get_downsampled_frames(input_filename: str, downsample_config: DownsampleConfig) -> np.array:
+    Returns:
+        Dict[str, np.array]: Downsampled region images, by region name.
+    """
+    frame_height, frame_width = frame.shape[:2]
+    regions = {}
+
+    for roi in downsample_config.rois:
+        xmin, ymin, xmax, ymax = roi.to_pixels(frame_width, frame_height)
+        out_xmin, out_ymin, out_xmax, out_ymax = roi.to_pixels(downsample_config.width, downsample_config.height)
+
+        region = cv2.cvtColor(frame[ymin:ymax, xmin:xmax], cv2.COLOR_BGR2RGB)
+        regions[roi.name] = _resize_frame(region, out_ymax - out_ymin, out_xmax - out_xmin, downsample_config.col_space)
+
+    return regions
+
+# %% ../nbs/feature_extraction_experiments.ipynb 10
+@dataclass
+class DecodedFrame:
+    """A sampled frame. With `Crop.ROI` only `regions` is set, by region name."""
+    idx: int
+    frame_number: int
+    image: Optional[np.array]
+    regions: Optional[Dict[str, np.array]] = None
+
+class _PrefetchError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_PREFETCH_END = object()
+
+def prefetch(iterable: Iterable, depth: int) -> Iterator:
+    """Consume `iterable` in a background thread, staying at most `depth`
+    items ahead of the caller. Exceptions are re-raised in the caller.
+
+    Args:
+        iterable (Iterable)
+        depth (int): Maximum number of items buffered. 0 disables prefetching.
+
+    Yields:
+        Items of `iterable`, in order.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_PREFETCH_END)
+        except BaseException as e:
+            put(_PrefetchError(e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name='prefetch', daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _PREFETCH_END:
+                return
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+def batched(iterable: Iterable, batch_size: int) -> Iterator[List]:
+    """Group `iterable` into lists of `batch_size` items (the last one may be shorter)."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# %% ../nbs/feature_extraction_experiments.ipynb 11
+def _to_decoded_frame(frame: np.array, downsample_config: DownsampleConfig, idx: int, frame_number: int) -> DecodedFrame:
+    if downsample_config.crop == Crop.ROI:
+        return DecodedFrame(idx=idx, frame_number=frame_number, image=None, regions=downsample_frame_regions(frame, downsample_config))
+
+    return DecodedFrame(idx=idx, frame_number=frame_number, image=downsample_frame(frame, downsample_config))
+
+def _iter_opencv_frames(input_filename: str, downsample_config: DownsampleConfig,
+                        sampling_strategy: SamplingStrategy) -> Iterator[DecodedFrame]:
     cap = cv2.VideoCapture(input_filename)
     
-    frames = []
+    idx = 0
     count = 0
+    stride = downsample_config.fps_ratio
     
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    logger.info('Total frames: %d', total_frames)
-    with tqdm(total=total_frames) as progress_bar:
-        while cap.isOpened():
-            ret, frame = cap.read()
-
-            if ret and count < total_frames:
-                count += downsample_config.fps_ratio
-                progress_bar.update(downsample_config.fps_ratio)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, count)
-            else:
-                cap.release()
+
+    if sampling_strategy == SamplingStrategy.AUTO:
+        sampling_strategy = choose_sampling_strategy(stride, get_video_keyframe_interval(input_filename))
+
+    logger.info('Total frames: %d, sampling strategy: %s', total_frames, sampling_strategy.value)
+    try:
+        with tqdm(total=total_frames) as progress_bar:
+            while cap.isOpened() and count < total_frames:
+                if not cap.grab():
+                    break
+
+                ret, frame = cap.retrieve()
+
+                if not ret:
+                    break
+
+                yield _to_decoded_frame(frame, downsample_config, idx=idx, frame_number=count)
+
+                idx += 1
+                count += stride
+                progress_bar.update(stride)
+
+                if sampling_strategy == SamplingStrategy.SEEK:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, count)
+                else:
+                    # Decode the skipped frames, but never convert them.
+                    for _ in range(stride - 1):
+                        if not cap.grab():
+                            break
+    finally:
+        cap.release()
+
+# %% ../nbs/feature_extraction_experiments.ipynb 13
+class DecodeBackend(str, enum.Enum):
+    OPENCV = "OPENCV"
+    FFMPEG = "FFMPEG"
+
+def _get_roi_layout(downsample_config: DownsampleConfig) -> List[Tuple[Roi, int, int, int]]:
+    """Get the (roi, row offset, height, width) of each region of interest when
+    the regions are stacked vertically in a single output frame.
+    """
+    layout = []
+    row_offset = 0
+
+    for roi in downsample_config.rois:
+        xmin, ymin, xmax, ymax = roi.to_pixels(downsample_config.width, downsample_config.height)
+        layout.append((roi, row_offset, ymax - ymin, xmax - xmin))
+        row_offset += ymax - ymin
+
+    return layout
+
+def _get_ffmpeg_output_shape(downsample_config: DownsampleConfig) -> tuple:
+    height, width = downsample_config.height, downsample_config.width
+
+    if downsample_config.crop == Crop.TOP_RIGHT:
+        height, width = height // 2, width - width // 2
+    elif downsample_config.crop == Crop.ROI:
+        layout = _get_roi_layout(downsample_config)
+        height, width = sum(x[2] for x in layout), max(x[3] for x in layout)
+
+    if downsample_config.col_space == ColorSpace.BW:
+        return (height, width)
+
+    return (height, width, 3)
+
+def _get_ffmpeg_roi_stream(stream, downsample_config: DownsampleConfig):
+    # Crop every region out of the source frame before scaling it, then pad the
+    # regions to a common width and stack them into one output frame.
+    layout = _get_roi_layout(downsample_config)
+    max_width = max(x[3] for x in layout)
+    branches = stream.split() if len(layout) > 1 else [stream]
+    region_streams = []
+
+    for idx, (roi, _, height, width) in enumerate(layout):
+        region = branches[idx].filter('crop', f'iw*{roi.width}', f'ih*{roi.height}', f'iw*{roi.x}', f'ih*{roi.y}')
+        region = region.filter('scale', width, height)
+
+        if width < max_width:
+            region = region.filter('pad', max_width, height, 0, 0)
+
+        region_streams.append(region)
+
+    if len(region_streams) == 1:
+        return region_streams[0]
+
+    return ffmpeg.filter(region_streams, 'vstack', inputs=len(region_streams))
+
+def _iter_ffmpeg_frames(input_filename: str, downsample_config: DownsampleConfig, ring_size: int) -> Iterator[DecodedFrame]:
+    stride = downsample_config.fps_ratio
+    width, height = downsample_config.width, downsample_config.height
+
+    stream = ffmpeg.input(input_filename)
+    stream = stream.filter('framestep', stride)
+
+    if downsample_config.crop == Crop.ROI:
+        stream = _get_ffmpeg_roi_stream(stream, downsample_config)
+    else:
+        stream = stream.filter('scale', width, height)
+
+    if downsample_config.crop == Crop.TOP_RIGHT:
+        stream = stream.filter('crop', width - width // 2, height // 2, width // 2, 0)
+
+    pix_fmt = 'gray' if downsample_config.col_space == ColorSpace.BW else 'rgb24'
+    process = (stream
+        .output('pipe:', format='rawvideo', pix_fmt=pix_fmt)
+        .global_args('-loglevel', 'error', '-nostats')
+        .run_async(pipe_stdout=True))
+
+    frame_shape = _get_ffmpeg_output_shape(downsample_config)
+    frame_size = int(np.prod(frame_shape))
+    buffers = [bytearray(frame_size) for _ in range(ring_size)]
+    roi_layout = _get_roi_layout(downsample_config) if downsample_config.crop == Crop.ROI else []
+
+    logger.info('Decoding with ffmpeg: %s', ' '.join(process.args))
+    try:
+        idx = 0
+        with tqdm(unit='frame') as progress_bar:
+            while True:
+                buffer = buffers[idx % ring_size]
+                view = memoryview(buffer)
+                num_read = 0
+
+                while num_read < frame_size:
+                    chunk_size = process.stdout.readinto(view[num_read:])
+                    if not chunk_size:
+                        break
+                    num_read += chunk_size
+
+                if num_read < frame_size:
+                    break
+
+                image = np.frombuffer(buffer, dtype=np.uint8).reshape(frame_shape)
+
+                if roi_layout:
+                    regions = {roi.name: image[row_offset:row_offset + roi_height, :roi_width]
+                               for roi, row_offset, roi_height, roi_width in roi_layout}
+                    yield DecodedFrame(idx=idx, frame_number=idx * stride, image=None, regions=regions)
+                else:
+                    yield DecodedFrame(idx=idx, frame_number=idx * stride, image=image)
+
+                idx += 1
+                progress_bar.update(1)
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+# %% ../nbs/feature_extraction_experiments.ipynb 15
+def get_video_keyframes(filename) -> Tuple[List[int], int]:
+    """Get the frame numbers of the keyframes in the first video stream, from
+    the packet headers (nothing is decoded).
+
+    Args:
+        filename
+
+    Returns:
+        Tuple[List[int], int]: Keyframe frame numbers and the total number of frames.
+    """
+    logger.info('Getting keyframes for {!r}'.format(filename))
+    probe = ffmpeg.probe(filename, select_streams='v:0', show_entries='packet=pts,flags')
+    packets = [packet for packet in probe.get('packets', []) if packet.get('pts', 'N/A') != 'N/A']
+    # Packets are stored in decode order, frame numbers follow presentation order.
+    packets = sorted(packets, key=lambda packet: int(packet['pts']))
+    keyframes = [frame_number for frame_number, packet in enumerate(packets) if 'K' in packet.get('flags', '')]
+
+    return keyframes, len(packets)
+
+def get_keyframe_shards(keyframes: List[int], total_frames: int, shard_length: int) -> List[Tuple[int, int]]:
+    """Split the frames of a video into contiguous [start, end) ranges of at
+    least `shard_length` frames, each starting on a keyframe.
+
+    Args:
+        keyframes (List[int]): Keyframe frame numbers.
+        total_frames (int)
+        shard_length (int)
+
+    Returns:
+        List[Tuple[int, int]]
+    """
+    starts = [0]
+
+    for keyframe in keyframes:
+        if keyframe - starts[-1] >= shard_length and keyframe < total_frames:
+            starts.append(keyframe)
+
+    return list(zip(starts, starts[1:] + [total_frames]))
+
+def _decode_shard(input_filename: str, downsample_config: DownsampleConfig, sampling_strategy: SamplingStrategy,
+                  start: int, end: int) -> List[DecodedFrame]:
+    cap = cv2.VideoCapture(input_filename)
+    stride = downsample_config.fps_ratio
+    frames = []
+
+    # Shards start on a keyframe, so the seek does not decode anything before it.
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    frame_number = start
+    try:
+        while frame_number < end:
+            if not cap.grab():
                 break
-            
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            resized_image = resize(frame, (downsample_config.height, downsample_config.width))
-
-            if downsample_config.col_space == ColorSpace.BW:
-                rgb_weights = [0.2989, 0.5870, 0.1140]
-                grayscale_image = np.dot(resized_image[...,:3], rgb_weights)
-                int_frame = (grayscale_image * 255).astype(np.uint8)
-            else:
-                int_frame = (resized_image * 255).astype(np.uint8)
 
-            frames.append(int_frame)
-    
+            if frame_number % stride == 0:
+                ret, frame = cap.retrieve()
+
+                if not ret:
+                    break
+
+                frames.append(_to_decoded_frame(frame, downsample_config, idx=frame_number // stride, frame_number=frame_number))
+
+                if sampling_strategy == SamplingStrategy.SEEK and frame_number + stride < end:
+                    frame_number += stride
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                    continue
+
+            frame_number += 1
+    finally:
+        cap.release()
+
     return frames
+
+def _iter_parallel_frames(input_filename: str, downsample_config: DownsampleConfig, sampling_strategy: SamplingStrategy,
+                          num_workers: int, frames_per_shard: int = 16) -> Iterator[DecodedFrame]:
+    stride = downsample_config.fps_ratio
+    keyframes, total_frames = get_video_keyframes(input_filename)
+
+    if sampling_strategy == SamplingStrategy.AUTO:
+        keyframe_interval = total_frames / len(keyframes) if keyframes else None
+        sampling_strategy = choose_sampling_strategy(stride, keyframe_interval)
+
+    shards = get_keyframe_shards(keyframes, total_frames, frames_per_shard * stride)
+    logger.info('Total frames: %d, decoding %d shards with %d workers, sampling strategy: %s',
+                total_frames, len(shards), num_workers, sampling_strategy.value)
+
+    # Spawn (instead of fork) since the caller may already be running threads.
+    mp_context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context) as executor:
+        shard_iter = iter(shards)
+        pending = collections.deque()
+
+        def submit(shard):
+            return executor.submit(_decode_shard, input_filename, downsample_config, sampling_strategy, *shard)
+
+        pending.extend(submit(shard) for shard in itertools.islice(shard_iter, 2 * num_workers))
+
+        with tqdm(total=total_frames) as progress_bar:
+            while pending:
+                future = pending.popleft()
+                pending.extend(submit(shard) for shard in itertools.islice(shard_iter, 1))
+                frames = future.result()
+
+                progress_bar.update(len(frames) * stride)
+                yield from frames
+
+# %% ../nbs/feature_extraction_experiments.ipynb 16
+def iter_downsampled_frames(input_filename: str, downsample_config: DownsampleConfig,
+                            sampling_strategy: SamplingStrategy = SamplingStrategy.AUTO,
+                            prefetch_depth: int = 4,
+                            backend: DecodeBackend = DecodeBackend.OPENCV,
+                            num_workers: int = 1) -> Iterator[DecodedFrame]:
+    """Stream the downsampled frames of a video as they are decoded.
+
+    Args:
+        input_filename (str)
+        downsample_config (DownsampleConfig)
+        sampling_strategy (SamplingStrategy, optional): Only used by the OpenCV backend. Defaults to SamplingStrategy.AUTO.
+        prefetch_depth (int, optional): Frames decoded ahead in a background thread. Defaults to 4.
+        backend (DecodeBackend, optional): Defaults to DecodeBackend.OPENCV.
+        num_workers (int, optional): Decode keyframe aligned shards in this many processes (OpenCV backend only). Defaults to 1.
+
+    Yields:
+        DecodedFrame: Frames in video order. With the ffmpeg backend the image
+        buffers are recycled after `prefetch_depth + 2` frames.
+    """
+    if backend == DecodeBackend.FFMPEG:
+        # One buffer per queued frame, plus the ones held by the producer and the consumer.
+        frames = _iter_ffmpeg_frames(input_filename, downsample_config, ring_size=prefetch_depth + 2)
+
+        if num_workers > 1:
+            logger.warning('Sharded decoding is not supported by the ffmpeg backend, relying on ffmpeg\'s decoder threads.')
+    elif num_workers > 1:
+        frames = _iter_parallel_frames(input_filename, downsample_config, sampling_strategy, num_workers)
+    else:
+        frames = _iter_opencv_frames(input_filename, downsample_config, sampling_strategy)
+
+    yield from prefetch(frames, prefetch_depth)
+
+def get_downsampled_frames(input_filename: str, downsample_config: DownsampleConfig,
+                           sampling_strategy: SamplingStrategy = SamplingStrategy.AUTO,
+                           backend: DecodeBackend = DecodeBackend.OPENCV) -> np.array:
+    frames = iter_downsampled_frames(input_filename, downsample_config, sampling_strategy, prefetch_depth=0, backend=backend)
+
+    if downsample_config.crop == Crop.ROI:
+        return [{name: region.copy() for name, region in frame.regions.items()} for frame in frames]
+
+    if backend == DecodeBackend.FFMPEG:
+        return [frame.image.copy() for frame in frames]
+
+    return [frame.image for frame in frames]
+
+# %% ../nbs/feature_extraction_experiments.ipynb 18
+FRAME_STORE_INDEX_FILE_NAME = 'frame_store.json'
+FRAME_STORE_FRAME_KEY = 'frame'
+
+@dataclass_json
+@dataclass
+class FrameStoreIndex:
+    """Frames in the store, in frame order. `shapes` holds the shape of a
+    single frame for every stored array, by key (`'frame'` or region name)."""
+    names: List[str] = field(default_factory=list)
+    frame_numbers: List[int] = field(default_factory=list)
+    timestamps: List[Optional[float]] = field(default_factory=list)
+    shapes: Dict[str, List[int]] = field(default_factory=dict)
+
+def _get_frame_store_data_path(frame_dir: os.PathLike, key: str) -> pathlib.Path:
+    return pathlib.Path(frame_dir) / f'{key}.u8'
+
+class FrameStoreWriter:
+    """Append decoded frames to the frame store in `frame_dir`. Use as a
+    context manager, the index is only written when no exception was raised.
+
+    Args:
+        frame_dir (os.PathLike)
+        fps (Optional[float], optional): Frame rate of the source video, used for the timestamps. Defaults to None.
+    """
+    def __init__(self, frame_dir: os.PathLike, fps: Optional[float] = None):
+        self.frame_dir = pathlib.Path(frame_dir)
+        self.fps = fps
+        self.index = FrameStoreIndex()
+        self._files = {}
+
+        # Never leave the index of a previous run next to new data.
+        (self.frame_dir / FRAME_STORE_INDEX_FILE_NAME).unlink(missing_ok=True)
+
+    def append(self, name: str, frame: DecodedFrame):
+        arrays = frame.regions if frame.image is None else {FRAME_STORE_FRAME_KEY: frame.image}
+
+        for key, array in arrays.items():
+            shape = list(array.shape)
+
+            if key not in self._files:
+                self.index.shapes[key] = shape
+                self._files[key] = open(_get_frame_store_data_path(self.frame_dir, key), 'wb')
+            elif self.index.shapes[key] != shape:
+                raise ValueError(f'Frame {name!r} has shape {shape} for {key!r}, expected {self.index.shapes[key]}.')
+
+            self._files[key].write(np.ascontiguousarray(array, dtype=np.uint8).data)
+
+        self.index.names.append(name)
+        self.index.frame_numbers.append(frame.frame_number)
+        self.index.timestamps.append(frame.frame_number / self.fps if self.fps else None)
+
+    def close(self, write_index: bool = True):
+        for f in self._files.values():
+            f.close()
+
+        self._files = {}
+
+        if write_index:
+            (self.frame_dir / FRAME_STORE_INDEX_FILE_NAME).write_text(self.index.to_json())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(write_index=exc_type is None)
+
+class FrameStore:
+    """Read-only access to the frame store in `frame_dir`. Frames are returned
+    as read-only views into the memory-mapped arrays.
+
+    Args:
+        frame_dir (os.PathLike)
+    """
+    def __init__(self, frame_dir: os.PathLike):
+        self.frame_dir = pathlib.Path(frame_dir)
+        self.index = FrameStoreIndex.from_json((self.frame_dir / FRAME_STORE_INDEX_FILE_NAME).read_text())
+        self._positions = {name: pos for pos, name in enumerate(self.index.names)}
+        self._arrays = {}
+
+    @staticmethod
+    def exists(frame_dir: os.PathLike) -> bool:
+        return (pathlib.Path(frame_dir) / FRAME_STORE_INDEX_FILE_NAME).exists()
+
+    def __len__(self) -> int:
+        return len(self.index.names)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index.shapes
+
+    def array(self, key: str = FRAME_STORE_FRAME_KEY) -> np.array:
+        """Get all frames stored for `key`, as a `(num_frames, *shape)` array."""
+        if key not in self._arrays:
+            shape = (len(self), *self.index.shapes[key])
+
+            # Empty files can not be memory-mapped.
+            if len(self) == 0:
+                self._arrays[key] = np.empty(shape, dtype=np.uint8)
+            else:
+                self._arrays[key] = np.memmap(_get_frame_store_data_path(self.frame_dir, key), dtype=np.uint8, mode='r', shape=shape)
+
+        return self._arrays[key]
+
+    def get(self, name: str, key: str = FRAME_STORE_FRAME_KEY) -> np.array:
+        return self.array(key)[self._positions[name]]
+
+@functools.lru_cache(maxsize=8)
+def _open_frame_store(frame_dir: str, index_mtime_ns: int) -> FrameStore:
+    return FrameStore(frame_dir)
+
+def open_frame_store(frame_dir: os.PathLike) -> Optional[FrameStore]:
+    """Open the frame store in `frame_dir`, if there is one. Stores are cached
+    until their index changes, so the memory maps are shared between calls.
+
+    Args:
+        frame_dir (os.PathLike)
+
+    Returns:
+        Optional[FrameStore]
+    """
+    index_path = pathlib.Path(frame_dir) / FRAME_STORE_INDEX_FILE_NAME
+
+    if not index_path.exists():
+        return None
+
+    return _open_frame_store(pathlib.Path(frame_dir).absolute().as_posix(), index_path.stat().st_mtime_ns)
+
+def close_frame_stores():
+    """Forget the cached frame stores. Their memory maps are closed once the
+    frames read from them are no longer referenced, so the space of deleted
+    stores is freed in long-running processes."""
+    _open_frame_store.cache_clear()
+
+# %% ../nbs/feature_extraction_experiments.ipynb 20
+DOWNSAMPLE_CONFIG_FILE_NAME = 'downsample_config.json'
+
+def save_downsample_config(frame_dir: os.PathLike, downsample_config: DownsampleConfig):
+    (pathlib.Path(frame_dir) / DOWNSAMPLE_CONFIG_FILE_NAME).write_text(downsample_config.to_json())
+
+def load_downsample_config(frame_dir: os.PathLike) -> Optional[DownsampleConfig]:
+    config_path = pathlib.Path(frame_dir) / DOWNSAMPLE_CONFIG_FILE_NAME
+
+    if not config_path.exists():
+        return None
+
+    return DownsampleConfig.from_json(config_path.read_text())
+
+def _imread_rgb(path: pathlib.Path) -> np.array:
+    img = cv2.imread(path.as_posix(), cv2.IMREAD_UNCHANGED)
+
+    if img is None:
+        raise FileNotFoundError(f'Could not read frame: {path}')
+
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    return img
+
+def _read_stored(frame_dir: pathlib.Path, name: str, key: str) -> np.array:
+    store = open_frame_store(frame_dir)
+
+    if store is not None:
+        return store.get(name, key)
+
+    if key == FRAME_STORE_FRAME_KEY:
+        return _imread_rgb(frame_dir / f'{name}.png')
+
+    return _imread_rgb(frame_dir / key / f'{name}.png')
+
+def list_frame_names(frame_dir: os.PathLike) -> List[str]:
+    """Get the names of the frames stored in the given directory, in frame order.
+
+    Args:
+        frame_dir (os.PathLike)
+
+    Returns:
+        List[str]
+    """
+    frame_dir = pathlib.Path(frame_dir)
+    store = open_frame_store(frame_dir)
+
+    if store is not None:
+        return list(store.index.names)
+
+    downsample_config = load_downsample_config(frame_dir)
+
+    if downsample_config is not None and downsample_config.crop == Crop.ROI:
+        frame_dir = frame_dir / downsample_config.rois[0].name
+
+    return sorted(path.stem for path in frame_dir.glob('*.png'))
+
+def read_frame(frame_dir: os.PathLike, name: str) -> np.array:
+    """Read a frame as an RGB (or grayscale) array. Frames stored as regions of
+    interest are pasted on a black canvas at their original position. Whole
+    frames from a frame store are read-only views.
+
+    Args:
+        frame_dir (os.PathLike)
+        name (str): Frame name, as returned by `list_frame_names`.
+
+    Returns:
+        np.array
+    """
+    frame_dir = pathlib.Path(frame_dir)
+    downsample_config = load_downsample_config(frame_dir)
+
+    if downsample_config is None or downsample_config.crop != Crop.ROI:
+        return _read_stored(frame_dir, name, FRAME_STORE_FRAME_KEY)
+
+    width, height = downsample_config.width, downsample_config.height
+    shape = (height, width) if downsample_config.col_space == ColorSpace.BW else (height, width, 3)
+    canvas = np.zeros(shape, dtype=np.uint8)
+
+    for roi in downsample_config.rois:
+        xmin, ymin, xmax, ymax = roi.to_pixels(width, height)
+        canvas[ymin:ymax, xmin:xmax] = _read_stored(frame_dir, name, roi.name)
+
+    return canvas
+
+def read_frame_region(frame_dir: os.PathLike, name: str, roi: Roi) -> np.array:
+    """Read a region of interest of a frame, only decoding that region if the
+    regions were stored separately.
+
+    Args:
+        frame_dir (os.PathLike)
+        name (str): Frame name, as returned by `list_frame_names`.
+        roi (Roi)
+
+    Returns:
+        np.array
+    """
+    frame_dir = pathlib.Path(frame_dir)
+    downsample_config = load_downsample_config(frame_dir)
+
+    if downsample_config is not None:
+        if downsample_config.crop == Crop.ROI and roi.name in {x.name for x in downsample_config.rois}:
+            return _read_stored(frame_dir, name, roi.name)
+
+        if downsample_config.crop == Crop.TOP_RIGHT and roi == KILLFEED_ROI:
+            return _read_stored(frame_dir, name, FRAME_STORE_FRAME_KEY)
+
+    frame = read_frame(frame_dir, name)
+    height, width = frame.shape[:2]
+    xmin, ymin, xmax, ymax = roi.to_pixels(width, height)
+
+    return frame[ymin:ymax, xmin:xmax]
+
+# %% ../nbs/feature_extraction_experiments.ipynb 22
+def make_synthetic_video(output_path: os.PathLike, width: int = 1920, height: int = 1080, num_frames: int = 600,
+                         fps: int = 60, keyframe_interval: Optional[int] = None) -> pathlib.Path:
+    """Write a synthetic test clip for benchmarking frame extraction.
+
+    Args:
+        output_path (os.PathLike): Path to the output video (.mp4).
+        width (int, optional): Defaults to 1920.
+        height (int, optional): Defaults to 1080.
+        num_frames (int, optional): Defaults to 600.
+        fps (int, optional): Defaults to 60.
+        keyframe_interval (Optional[int], optional): Re-encode with a fixed GOP of this size. Defaults to None (OpenCV's mp4v encoder defaults).
+
+    Returns:
+        pathlib.Path: Path to the written video.
+    """
+    output_path = pathlib.Path(output_path)
+    raw_path = output_path if keyframe_interval is None else output_path.with_name(f'{output_path.stem}.raw{output_path.suffix}')
+
+    rng = np.random.default_rng(0)
+    texture = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    texture = cv2.resize(texture, (width, height), interpolation=cv2.INTER_NEAREST)
+
+    writer = cv2.VideoWriter(raw_path.as_posix(), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for idx in range(num_frames):
+        frame = np.roll(texture, idx * 4, axis=1)
+        cv2.putText(frame, f'{idx:05}', (width // 16, height // 8), cv2.FONT_HERSHEY_SIMPLEX, height / 360, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+    if keyframe_interval is not None:
+        (ffmpeg
+            .input(raw_path.as_posix())
+            .output(output_path.as_posix(), vcodec='libx264', pix_fmt='yuv420p', g=keyframe_interval, keyint_min=keyframe_interval, sc_threshold=0)
+            .overwrite_output()
+            .run(quiet=True))
+        raw_path.unlink()
+
+    return output_path
@@ -0,0 +1,6 @@
+#!/bin/bash
+
+SCRIPT_DIR=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
+
+# Runs the command on `autotrim.sh serve`, the client only needs the standard library.
+python "$SCRIPT_DIR/cli/client.py" "$@"
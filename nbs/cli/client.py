@@ -0,0 +1,74 @@
+"""Thin client of `autotrim serve`: sends a command line to the daemon over
+its Unix socket, and streams back its output and logs. Only uses the
+standard library, so it starts without the dependencies of the pipeline.
+
+    python cli/client.py segment elimination --image-dir-path frames/
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import IO, Iterator, List, Optional
+
+SOCKET_ENV_VAR = 'AUTOTRIM_SOCKET'
+
+# Messages are JSON objects, one per line. The client sends a single request:
+#   {"args": [...], "cwd": "..."}
+# and the daemon answers with output, then the exit code of the command:
+#   {"stream": "stdout" | "stderr", "data": "..."}
+#   {"exit_code": 0}
+
+def get_socket_path() -> Path:
+    return Path(os.getenv(SOCKET_ENV_VAR, Path(tempfile.gettempdir()) / 'autotrim.sock'))
+
+def send_message(sock: socket.socket, message: dict):
+    sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+def iter_messages(sock: socket.socket) -> Iterator[dict]:
+    with sock.makefile('r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+def run_command(args: List[str], socket_path: Optional[Path] = None, cwd: Optional[Path] = None,
+                stdout: Optional[IO[str]] = None, stderr: Optional[IO[str]] = None) -> int:
+    """Run a command line of the CLI on the daemon.
+
+    Args:
+        args (List[str]): Arguments, as for `autotrim.sh`.
+        socket_path (Optional[Path], optional): Defaults to None (AUTOTRIM_SOCKET or '<tmp>/autotrim.sock').
+        cwd (Optional[Path], optional): Directory relative paths are resolved from. Defaults to None (the current directory).
+        stdout (Optional[IO[str]], optional): Defaults to None (sys.stdout).
+        stderr (Optional[IO[str]], optional): Log output. Defaults to None (sys.stderr).
+
+    Returns:
+        int: Exit code of the command.
+    """
+    streams = {'stdout': stdout or sys.stdout, 'stderr': stderr or sys.stderr}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(os.fspath(socket_path or get_socket_path()))
+        send_message(sock, {'args': args, 'cwd': os.fspath(cwd or os.getcwd())})
+
+        for message in iter_messages(sock):
+            if 'exit_code' in message:
+                return message['exit_code']
+
+            stream = streams[message['stream']]
+            stream.write(message['data'])
+            stream.flush()
+
+    raise ConnectionError('The daemon closed the connection before the command finished.')
+
+def main():
+    socket_path = get_socket_path()
+
+    try:
+        sys.exit(run_command(sys.argv[1:], socket_path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f'No daemon listening on {socket_path}, start one with `autotrim.sh serve`.', file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+from typing_extensions import Annotated
+
+import typer
+
+from csgo_clips_autotrim.artifacts import ARTIFACT_CACHE_DIR_ENV_VAR, seed_artifacts
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+def _get_default_artifacts() -> List[Tuple[str, str]]:
+    # Artifacts used by the default models of the pipeline commands. Their
+    # modules (and the segmentation stack) are only imported when seeding them.
+    from cli.commands import clutch, segment
+    from csgo_clips_autotrim.ocr import OCR_DICTIONARY_ARTIFACT_PATH
+    from csgo_clips_autotrim.segmentation.elimination import MODEL_CONFIG_ARTIFACT_PATH
+
+    return [
+        (segment.default_elimination_inference_config.mlflow_artifact_run_id, MODEL_CONFIG_ARTIFACT_PATH),
+        (segment.default_weapon_inference_config.mlflow_artifact_run_id, MODEL_CONFIG_ARTIFACT_PATH),
+        (segment.default_ocr_inference_config.mlflow_artifact_run_id, OCR_DICTIONARY_ARTIFACT_PATH),
+        (clutch.default_game_state_inference_config.mlflow_artifact_run_id, MODEL_CONFIG_ARTIFACT_PATH),
+    ]
+
+def _parse_artifact(artifact: str) -> Tuple[str, str]:
+    run_id, sep, artifact_path = artifact.partition('/')
+
+    if not sep or not run_id or not artifact_path:
+        raise typer.BadParameter(f'Expected <run id>/<artifact path>, got: {artifact}')
+
+    return run_id, artifact_path
+
+@app.command()
+def seed(artifacts: Annotated[Optional[List[str]], typer.Argument()] = None,
+         cache_dir: Annotated[Optional[Path],
+                                typer.Option(
+                                   envvar=ARTIFACT_CACHE_DIR_ENV_VAR,
+                                   file_okay=False,
+                                   dir_okay=True,
+                                   resolve_path=True,
+                                )] = None):
+    """Download model artifacts into the local artifact cache (and check the
+    cached ones), so workers can start with AUTOTRIM_OFFLINE set.
+
+    Args:
+        artifacts (Optional[List[str]], optional): Artifacts as <run id>/<artifact path>. Defaults to None (the artifacts of the default models).
+        cache_dir (Optional[Path], optional): Defaults to None (AUTOTRIM_ARTIFACT_CACHE_DIR or ~/.cache/autotrim/artifacts).
+    """
+    artifacts = [_parse_artifact(artifact) for artifact in artifacts] if artifacts else _get_default_artifacts()
+
+    for (run_id, artifact_path), path in zip(artifacts, seed_artifacts(artifacts, cache_dir)):
+        # Cached files are stored by their SHA-256.
+        print(f'{run_id}/{artifact_path}\t{path.parent.name}\t{path}')
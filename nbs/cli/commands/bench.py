@@ -0,0 +1,518 @@
+import concurrent.futures
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import unittest.mock
+from pathlib import Path
+from typing import List, Optional
+from typing_extensions import Annotated
+
+import numpy as np
+import tritonclient.http as httpclient
+import typer
+
+from cli.main import SUBCOMMANDS
+from cli.reports import write_report
+from cli.stand_in import StandInInferenceServer
+from csgo_clips_autotrim.experiment_utils.config import InferenceConfig
+from csgo_clips_autotrim.inference import get_inference_backend, triton_client
+from csgo_clips_autotrim.feature_extraction import (get_video_metadata, iter_downsampled_frames, make_synthetic_video, DecodeBackend,
+                                                   DownsampleConfig)
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+DEFAULT_RESOLUTIONS = ['1920x1080', '1280x720']
+DEFAULT_KEYFRAME_INTERVALS = [30, 250]
+DEFAULT_DOWNSAMPLE_CONFIGS = [
+    'downsample_1280x720_60_RGB',
+    'downsample_1280x720_30_RGB',
+    'downsample_640x360_60_BW',
+    'downsample_1280x720_60_RGB_TOPRIGHT',
+    'downsample_1280x720_60_RGB_ROI-killfeed+hud',
+]
+
+CLI_MAIN_PATH = Path(__file__).resolve().parents[1] / 'main.py'
+
+def _run_extraction_case(video_path: str, downsample_config: str, backend: DecodeBackend, num_workers: int) -> dict:
+    # Runs in a fresh process, so the resource usage only covers this case.
+    config = DownsampleConfig.from_str(downsample_config)
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+
+    tic = time.perf_counter()
+    num_sampled = sum(1 for _ in iter_downsampled_frames(video_path, config, backend=backend, num_workers=num_workers))
+    toc = time.perf_counter()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ffmpeg and the decode workers run as child processes.
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return {
+        'sampled_frames': num_sampled,
+        'wall_time': toc - tic,
+        'cpu_time': (usage.ru_utime - usage_start.ru_utime) + (usage.ru_stime - usage_start.ru_stime),
+        'cpu_time_children': usage_children.ru_utime + usage_children.ru_stime,
+        # ru_maxrss is in KiB on Linux.
+        'peak_rss_mb': usage.ru_maxrss / 1024,
+        'peak_rss_children_mb': usage_children.ru_maxrss / 1024,
+    }
+
+def _write_report(report: dict, output_path: Optional[Path]):
+    write_report({
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        **report,
+    }, output_path)
+
+def _summarize_latencies(latencies: List[float]) -> dict:
+    latencies = np.array(latencies)
+
+    return {
+        'requests': len(latencies),
+        'mean_ms': 1000 * latencies.mean(),
+        'p50_ms': 1000 * np.percentile(latencies, 50),
+        'p95_ms': 1000 * np.percentile(latencies, 95),
+        'p99_ms': 1000 * np.percentile(latencies, 99),
+    }
+
+@app.command()
+def extraction(work_dir: Annotated[Optional[Path],
+                                   typer.Option(
+                                      file_okay=False,
+                                      dir_okay=True,
+                                      resolve_path=True,
+                                   )] = None,
+               output_path: Annotated[Optional[Path],
+                                   typer.Option(
+                                      file_okay=True,
+                                      dir_okay=False,
+                                      resolve_path=True,
+                                   )] = None,
+               resolution: Annotated[Optional[List[str]], typer.Option()] = None,
+               keyframe_interval: Annotated[Optional[List[int]], typer.Option()] = None,
+               downsample_config: Annotated[Optional[List[str]], typer.Option()] = None,
+               backend: Annotated[Optional[List[DecodeBackend]], typer.Option()] = None,
+               num_frames: int = 600,
+               fps: int = 60,
+               num_workers: int = 1):
+    """Benchmark frame extraction on synthetic clips, for every combination of
+    clip, decode backend and downsample config. Every case runs in its own
+    process. Results are written as JSON.
+
+    Args:
+        work_dir (Optional[Path], optional): Directory for the synthetic clips, reused by runs with the same work dir. Defaults to None (a temporary directory, removed after the run).
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        resolution (Optional[List[str]], optional): Clip resolutions, as WIDTHxHEIGHT. Defaults to DEFAULT_RESOLUTIONS.
+        keyframe_interval (Optional[List[int]], optional): Clip GOP sizes. Defaults to DEFAULT_KEYFRAME_INTERVALS.
+        downsample_config (Optional[List[str]], optional): Downsample configs. Defaults to DEFAULT_DOWNSAMPLE_CONFIGS.
+        backend (Optional[List[DecodeBackend]], optional): Decode backends. Defaults to all.
+        num_frames (int, optional): Frames per clip. Defaults to 600.
+        fps (int, optional): Clip frame rate. Defaults to 60.
+        num_workers (int, optional): Decode workers, passed to `iter_downsampled_frames`. Defaults to 1.
+    """
+    resolutions = resolution or DEFAULT_RESOLUTIONS
+    keyframe_intervals = keyframe_interval or DEFAULT_KEYFRAME_INTERVALS
+    downsample_configs = downsample_config or DEFAULT_DOWNSAMPLE_CONFIGS
+    backends = backend or list(DecodeBackend)
+
+    # Without a work dir, the clips are written to a temporary directory removed after the run.
+    with (contextlib.nullcontext(work_dir) if work_dir is not None else tempfile.TemporaryDirectory(prefix='autotrim-bench-')) as work_dir:
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        videos = []
+        for res, gop in itertools.product(resolutions, keyframe_intervals):
+            width, height = (int(x) for x in res.split('x'))
+            video_path = work_dir / f'synthetic_{width}x{height}_gop{gop}_{num_frames}f.mp4'
+
+            if not video_path.exists():
+                logger.info('Writing synthetic clip: %s', video_path.as_posix())
+                make_synthetic_video(video_path, width=width, height=height, num_frames=num_frames, fps=fps, keyframe_interval=gop)
+
+            videos.append((video_path, width, height, gop))
+
+        results = []
+        mp_context = multiprocessing.get_context('spawn')
+
+        for (video_path, width, height, gop), config, decode_backend in itertools.product(videos, downsample_configs, backends):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as executor:
+                result = executor.submit(_run_extraction_case, video_path.as_posix(), config, decode_backend, num_workers).result()
+
+            video_frames = get_video_metadata(video_path).num_frames
+            result = {
+                'video': video_path.name,
+                'width': width,
+                'height': height,
+                'keyframe_interval': gop,
+                'video_frames': video_frames,
+                'downsample_config': config,
+                'backend': decode_backend.value,
+                'num_workers': num_workers,
+                **result,
+                'video_frames_per_second': video_frames / result['wall_time'],
+                'sampled_frames_per_second': result['sampled_frames'] / result['wall_time'],
+            }
+            results.append(result)
+
+            logger.info('%-40s %-48s %-7s %8.1f video frames/s, cpu %6.2fs (+%6.2fs children), peak rss %7.1fMB',
+                        video_path.name, config, decode_backend.value, result['video_frames_per_second'],
+                        result['cpu_time'], result['cpu_time_children'], max(result['peak_rss_mb'], result['peak_rss_children_mb']))
+
+    _write_report({'results': results}, output_path)
+
+@app.command()
+def inference(output_path: Annotated[Optional[Path],
+                                  typer.Option(
+                                     file_okay=True,
+                                     dir_okay=False,
+                                     resolve_path=True,
+                                  )] = None,
+              num_requests: int = 200,
+              input_size: int = 640,
+              latency: float = 0.,
+              concurrency: int = 1):
+    """Benchmark the per-request latency of the Triton client against a local
+    stand-in inference server, with a new client per request (no keep-alive)
+    and with the shared clients. Results are written as JSON.
+
+    Args:
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        num_requests (int, optional): Defaults to 200.
+        input_size (int, optional): Side of the (1, 3, size, size) FP32 input. Defaults to 640.
+        latency (float, optional): Artificial server latency, in seconds. Defaults to 0.
+        concurrency (int, optional): Connection pool size of the clients. Defaults to 1.
+    """
+    img = np.zeros((1, 3, input_size, input_size), dtype=np.float32)
+    results = []
+
+    with StandInInferenceServer(latency=latency) as server:
+        for keepalive in (False, True):
+            inference_config = InferenceConfig(mlflow_artifact_run_id='',
+                                               triton_model_name='stand-in',
+                                               triton_url=server.url,
+                                               score_threshold=0.,
+                                               triton_concurrency=concurrency,
+                                               triton_keepalive=keepalive)
+            latencies = []
+
+            for _ in range(num_requests):
+                tic = time.perf_counter()
+                with triton_client(inference_config) as client:
+                    inputs = httpclient.InferInput('input', img.shape, datatype='FP32')
+                    inputs.set_data_from_numpy(img, binary_data=True)
+                    client.infer(model_name=inference_config.triton_model_name, inputs=[inputs])
+                latencies.append(time.perf_counter() - tic)
+
+            result = {'keepalive': keepalive, **_summarize_latencies(latencies)}
+            results.append(result)
+            logger.info('keepalive: %-5s mean %7.2fms, p50 %7.2fms, p95 %7.2fms',
+                        keepalive, result['mean_ms'], result['p50_ms'], result['p95_ms'])
+
+    _write_report({'input_shape': list(img.shape), 'server_latency': latency, 'results': results}, output_path)
+
+# Letterbox model config of the stand-in elimination and weapon models, like
+# the configs of the real models.
+STAND_IN_MODEL_CONFIG = """test_pipeline = [
+    dict(type='LoadImageFromFile'),
+    dict(type='YOLOv5KeepRatioResize', scale=({size}, {size})),
+    dict(type='LetterResize', scale=({size}, {size}), allow_scale_up=False, pad_val=dict(img=114)),
+    dict(type='LoadAnnotations', with_bbox=True),
+    dict(type='PackDetInputs', meta_keys=('img_id', 'img_path', 'ori_shape', 'img_shape', 'scale_factor', 'pad_param')),
+]
+test_dataloader = dict(dataset=dict(pipeline=test_pipeline))
+"""
+STAND_IN_ELIMINATION_INPUT_SIZE = 640
+STAND_IN_WEAPON_INPUT_SIZE = 160
+STAND_IN_OCR_DICTIONARY = 'a\nb\nc\n'
+
+def _add_stand_in_artifacts(work_dir: Path) -> dict:
+    # Artifacts of the stand-in models, in the (temporary) artifact cache.
+    from csgo_clips_autotrim.artifacts import add_artifact
+    from csgo_clips_autotrim.ocr import OCR_DICTIONARY_ARTIFACT_PATH
+    from csgo_clips_autotrim.segmentation.elimination import MODEL_CONFIG_ARTIFACT_PATH
+
+    for name, size in (('elimination', STAND_IN_ELIMINATION_INPUT_SIZE), ('weapon', STAND_IN_WEAPON_INPUT_SIZE)):
+        config_path = work_dir / f'stand-in-{name}.py'
+        config_path.write_text(STAND_IN_MODEL_CONFIG.format(size=size))
+        add_artifact(f'stand-in-{name}', MODEL_CONFIG_ARTIFACT_PATH, config_path)
+
+    dictionary_path = work_dir / 'stand-in-dict.txt'
+    dictionary_path.write_text(STAND_IN_OCR_DICTIONARY)
+    add_artifact('stand-in-ocr', OCR_DICTIONARY_ARTIFACT_PATH, dictionary_path)
+
+def _respond_stand_in_segmentation(request: dict, num_events: int) -> dict:
+    # Every frame has `num_events` elimination events stacked in the killfeed,
+    # each with a weapon, and every OCR request reads the first character.
+    input_name, shape = request['inputs'][0]['name'], request['inputs'][0]['shape']
+    batch_size = shape[0]
+
+    if input_name == 'x':
+        probabilities = np.zeros((batch_size, 10, len(STAND_IN_OCR_DICTIONARY.split()) + 2), dtype=np.float32)
+        probabilities[:, :, 0] = 1.
+        probabilities[:, 0, :2] = [0., 1.]
+        return {'softmax_2.tmp_0': probabilities}
+
+    height, width = shape[2:]
+
+    if height == STAND_IN_WEAPON_INPUT_SIZE:
+        dets = [[.45 * width, .49 * height, .55 * width, .51 * height, 1.]]
+    else:
+        dets = [[.2 * width, (.3 + .4 * idx / num_events) * height, .95 * width, (.3 + .4 * (idx + .8) / num_events) * height, 1.]
+                for idx in range(num_events)]
+
+    dets = np.array(dets, dtype=np.float32)
+
+    return {'dets': np.repeat(dets[None], batch_size, axis=0), 'labels': np.zeros((batch_size, len(dets)), dtype=np.int64)}
+
+@app.command()
+def workers(output_path: Annotated[Optional[Path],
+                                typer.Option(
+                                   file_okay=True,
+                                   dir_okay=False,
+                                   resolve_path=True,
+                                )] = None,
+            worker_counts: Annotated[Optional[List[int]], typer.Option('--workers')] = None,
+            in_flight_counts: Annotated[Optional[List[int]], typer.Option('--in-flight')] = None,
+            batch_sizes: Annotated[Optional[List[int]], typer.Option('--batch-size')] = None,
+            num_frames: int = 60,
+            num_events: int = 2,
+            latency: float = 0.02,
+            max_concurrency: int = 8):
+    """Benchmark the throughput of `segment elimination`, for every combination
+    of `--workers`, `--in-flight` and `--batch-size`. The whole command runs
+    on synthetic 1280x720 frames (every killfeed changed), against a local
+    stand-in inference server with artificial latency, with stand-in models
+    finding `num_events` elimination events per frame. Results are written as
+    JSON.
+
+    Args:
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        worker_counts (Optional[List[int]], optional): Thread pool sizes. Defaults to [1, 2, 4, 8].
+        in_flight_counts (Optional[List[int]], optional): Elimination model requests in flight. Defaults to [1, 4].
+        batch_sizes (Optional[List[int]], optional): Frames per elimination model request. Defaults to [1, 4].
+        num_frames (int, optional): Defaults to 60.
+        num_events (int, optional): Elimination events per frame. Defaults to 2.
+        latency (float, optional): Artificial server latency, in seconds. Defaults to 0.02.
+        max_concurrency (int, optional): Requests the server handles at once. Defaults to 8.
+    """
+    import cv2
+
+    from cli.commands import segment
+    from csgo_clips_autotrim.artifacts import ARTIFACT_CACHE_DIR_ENV_VAR, OFFLINE_ENV_VAR
+    from csgo_clips_autotrim.segmentation import elimination as elimination_segmentation
+
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix='autotrim-bench-') as work_dir, \
+         unittest.mock.patch.dict(os.environ, {ARTIFACT_CACHE_DIR_ENV_VAR: os.path.join(work_dir, 'artifacts'), OFFLINE_ENV_VAR: '1'}), \
+         StandInInferenceServer(respond=lambda request: _respond_stand_in_segmentation(request, num_events),
+                                latency=latency, max_concurrency=max_concurrency) as server:
+        work_dir = Path(work_dir)
+        _add_stand_in_artifacts(work_dir)
+
+        image_dir_path = work_dir / 'frames'
+        image_dir_path.mkdir()
+        rng = np.random.default_rng(0)
+
+        for idx in range(num_frames):
+            cv2.imwrite((image_dir_path / f'synthetic_{idx:05d}.png').as_posix(), rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8))
+
+        inference_configs = {name: InferenceConfig(mlflow_artifact_run_id=f'stand-in-{name}',
+                                                   triton_model_name=f'stand-in-{name}',
+                                                   triton_url=server.url,
+                                                   score_threshold=.5)
+                             for name in ('elimination', 'weapon', 'ocr')}
+        # Model configs are parsed once, before the first case is timed.
+        elimination_segmentation.warmup_test_pipelines(['stand-in-elimination', 'stand-in-weapon'])
+
+        for num_workers, in_flight, batch_size in itertools.product(worker_counts or [1, 2, 4, 8], in_flight_counts or [1, 4], batch_sizes or [1, 4]):
+            output_dir = work_dir / f'out_w{num_workers}_f{in_flight}_b{batch_size}'
+            num_requests = server.num_requests
+            tic = time.perf_counter()
+
+            segment.run_elimination_segmentation(image_dir_path, output_dir, inference_configs['elimination'], inference_configs['weapon'],
+                                                 inference_configs['ocr'], batch_size=batch_size, in_flight=in_flight, workers=num_workers)
+
+            wall_time = time.perf_counter() - tic
+            num_requests = server.num_requests - num_requests
+            result = {
+                'workers': num_workers,
+                'in_flight': in_flight,
+                'batch_size': batch_size,
+                'segmented_frames': len(elimination_segmentation.read_segmentation_results(output_dir)),
+                'requests': num_requests,
+                'wall_time': wall_time,
+                'frames_per_second': num_frames / wall_time,
+                'requests_per_second': num_requests / wall_time,
+            }
+            result['speedup'] = result['frames_per_second'] / results[0]['frames_per_second'] if results else 1.
+            results.append(result)
+            logger.info('workers: %3d, in flight: %3d, batch size: %3d, %8.1f frames/s, %8.1f requests/s (%.1fx)',
+                        num_workers, in_flight, batch_size, result['frames_per_second'], result['requests_per_second'], result['speedup'])
+
+    _write_report({'server_latency': latency, 'server_max_concurrency': max_concurrency,
+                   'num_frames': num_frames, 'num_events': num_events, 'results': results}, output_path)
+
+@app.command()
+def onnxruntime(onnx_model_path: Annotated[Path,
+                                        typer.Option(
+                                           exists=True,
+                                           file_okay=True,
+                                           dir_okay=False,
+                                           readable=True,
+                                           resolve_path=True,
+                                        )],
+                output_path: Annotated[Optional[Path],
+                                        typer.Option(
+                                           file_okay=True,
+                                           dir_okay=False,
+                                           resolve_path=True,
+                                        )] = None,
+                input_name: str = 'input',
+                input_shape: str = '1x3x640x640',
+                output_names: Annotated[Optional[List[str]], typer.Option('--output-name')] = None,
+                intra_op_threads: Annotated[Optional[List[int]], typer.Option()] = None,
+                inter_op_threads: Annotated[Optional[List[int]], typer.Option()] = None,
+                num_requests: int = 50,
+                num_warmup: int = 5):
+    """Benchmark the latency of a model on the onnxruntime inference backend,
+    for every combination of intra and inter op thread counts. Results are
+    written as JSON.
+
+    Args:
+        onnx_model_path (Path)
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        input_name (str, optional): Defaults to 'input'.
+        input_shape (str, optional): FP32 input shape, dimensions separated by 'x'. Defaults to '1x3x640x640'.
+        output_names (Optional[List[str]], optional): Defaults to ['dets', 'labels'].
+        intra_op_threads (Optional[List[int]], optional): Defaults to [0] (onnxruntime's default).
+        inter_op_threads (Optional[List[int]], optional): Defaults to [0] (onnxruntime's default).
+        num_requests (int, optional): Defaults to 50.
+        num_warmup (int, optional): Requests before measuring. Defaults to 5.
+    """
+    img = np.random.default_rng(0).random([int(x) for x in input_shape.split('x')], dtype=np.float32)
+    results = []
+
+    for intra_op_num_threads, inter_op_num_threads in itertools.product(intra_op_threads or [0], inter_op_threads or [0]):
+        inference_config = InferenceConfig(mlflow_artifact_run_id='',
+                                           triton_model_name=onnx_model_path.stem,
+                                           triton_url='',
+                                           score_threshold=0.,
+                                           backend='onnxruntime',
+                                           onnx_model_path=onnx_model_path.as_posix(),
+                                           intra_op_num_threads=intra_op_num_threads,
+                                           inter_op_num_threads=inter_op_num_threads)
+        backend = get_inference_backend(inference_config)
+        latencies = []
+
+        for idx in range(num_warmup + num_requests):
+            tic = time.perf_counter()
+            backend.infer({input_name: img}, output_names or ['dets', 'labels'])
+
+            if idx >= num_warmup:
+                latencies.append(time.perf_counter() - tic)
+
+        result = {'intra_op_num_threads': intra_op_num_threads, 'inter_op_num_threads': inter_op_num_threads, **_summarize_latencies(latencies)}
+        results.append(result)
+        logger.info('intra op threads: %2d, inter op threads: %2d, mean %7.2fms, p50 %7.2fms, p95 %7.2fms',
+                    intra_op_num_threads, inter_op_num_threads, result['mean_ms'], result['p50_ms'], result['p95_ms'])
+
+    _write_report({'model': onnx_model_path.as_posix(), 'input_shape': list(img.shape), 'results': results}, output_path)
+
+def _parse_importtime(stderr: str) -> List[dict]:
+    # Lines of `-X importtime` are "import time: <self us> | <cumulative us> | <name>",
+    # names indented by two spaces per level of nesting.
+    imports = []
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+
+        if not self_us.strip().isdigit():
+            continue
+
+        name = name[1:].rstrip()
+        imports.append({'module': name.strip(), 'top_level': not name.startswith(' '),
+                        'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+
+    return imports
+
+def _run_startup_case(subcommand: List[str], num_slowest: int) -> dict:
+    # Runs in a fresh interpreter, like `autotrim.sh`. `--help` resolves the
+    # subcommand, importing its module, without running it.
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [CLI_MAIN_PATH.parents[1].as_posix(), os.getenv('PYTHONPATH')]))}
+
+    tic = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', CLI_MAIN_PATH.as_posix(), *subcommand, '--help'],
+                             env=env, capture_output=True, text=True)
+    wall_time = time.perf_counter() - tic
+
+    if process.returncode != 0:
+        raise RuntimeError(f'autotrim {" ".join(subcommand)} --help failed: {process.stderr.splitlines()[-1:]}')
+
+    imports = _parse_importtime(process.stderr)
+    top_level = sorted([x for x in imports if x['top_level']], key=lambda x: x['cumulative_ms'], reverse=True)
+
+    return {
+        'wall_time_ms': wall_time * 1000,
+        'import_time_ms': sum(x['cumulative_ms'] for x in top_level),
+        'num_modules': len(imports),
+        'slowest_imports': [{'module': x['module'], 'cumulative_ms': x['cumulative_ms']} for x in top_level[:num_slowest]],
+        'loaded_packages': sorted({x['module'].split('.')[0] for x in imports}),
+    }
+
+@app.command()
+def startup(output_path: Annotated[Optional[Path],
+                                typer.Option(
+                                   file_okay=True,
+                                   dir_okay=False,
+                                   resolve_path=True,
+                                )] = None,
+            subcommands: Annotated[Optional[List[str]], typer.Option('--subcommand')] = None,
+            num_repeats: int = 3,
+            num_slowest: int = 10,
+            budget_ms: Optional[float] = None):
+    """Benchmark the startup of the CLI, for each subcommand: the time spent
+    importing modules (with `python -X importtime`) before `--help` can be
+    shown, and the slowest top level imports. Each subcommand runs in a fresh
+    interpreter, and the fastest of the repeats is kept. Results are written
+    as JSON, and the command fails if a subcommand is over the budget.
+
+    Args:
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        subcommands (Optional[List[str]], optional): Subcommands, '' for the CLI itself. Defaults to None (the CLI and all subcommands).
+        num_repeats (int, optional): Defaults to 3.
+        num_slowest (int, optional): Slowest top level imports to report. Defaults to 10.
+        budget_ms (Optional[float], optional): Import time budget of every subcommand, in milliseconds. Defaults to None (no budget).
+    """
+    results = []
+
+    for subcommand in subcommands or ['', *SUBCOMMANDS]:
+        runs = [_run_startup_case(subcommand.split(), num_slowest) for _ in range(num_repeats)]
+        result = {'subcommand': subcommand, **min(runs, key=lambda run: run['import_time_ms'])}
+        result['over_budget'] = budget_ms is not None and result['import_time_ms'] > budget_ms
+        results.append(result)
+        logger.info('%-12s imports %8.1fms (%4d modules), wall %8.1fms, slowest: %s%s',
+                    subcommand or '<cli>', result['import_time_ms'], result['num_modules'], result['wall_time_ms'],
+                    ', '.join(x['module'] for x in result['slowest_imports'][:3]), ' (over budget)' if result['over_budget'] else '')
+
+    _write_report({'python_executable': sys.executable, 'budget_ms': budget_ms, 'num_repeats': num_repeats, 'results': results}, output_path)
+
+    if any(result['over_budget'] for result in results):
+        logger.error('Over the import time budget of %.1fms: %s', budget_ms,
+                     ', '.join(result['subcommand'] or '<cli>' for result in results if result['over_budget']))
+        raise typer.Exit(code=1)
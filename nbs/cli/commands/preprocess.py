@@ -5,7 +5,8 @@ from typing_extensions import Annotated
 import typer
 from PIL import Image
 
-from csgo_clips_autotrim.feature_extraction import get_downsampled_frames, DownsampleConfig
+from csgo_clips_autotrim.feature_extraction import (get_video_fps, iter_downsampled_frames, save_downsample_config, Crop, DecodeBackend,
+                                                   DownsampleConfig, FrameStoreWriter)
 
 log = logging.getLogger(__name__)
 
@@ -29,24 +30,53 @@ def downsample(video_path: Annotated[Path,
                                         readable=True,
                                         resolve_path=True,
                                      )] = './out',
-                                     downsample_config: str = 'downsample_1280x720_60_RGB'):
-    """Downsample the given video into individual frames according to the
+                                     downsample_config: str = 'downsample_1280x720_60_RGB',
+                                     prefetch: int = 4,
+                                     backend: DecodeBackend = DecodeBackend.OPENCV,
+                                     num_workers: int = 1,
+                                     export_png: bool = False):
+    """Downsample the given video into a frame store according to the
     supplied downsample config.
 
     Args:
         video_path (Annotated[Path, typer.Option, optional): Path to video file to downsample. Defaults to True, file_okay=True, dir_okay=False, writable=False, readable=True, resolve_path=True, )].
         output_dir (Annotated[Path, typer.Option, optional): Path to output directory. Defaults to False, dir_okay=True, writable=False, readable=True, resolve_path=True, )]='./out'.
         downsample_config (str, optional): Downsample config represented by a string. Defaults to 'downsample_1280x720_60_RGB'.
+        prefetch (int, optional): Number of frames decoded ahead of the writer. Defaults to 4.
+        backend (DecodeBackend, optional): Decoder used to extract frames. Defaults to DecodeBackend.OPENCV.
+        num_workers (int, optional): Processes decoding keyframe aligned shards of the video (OpenCV backend). Defaults to 1.
+        export_png (bool, optional): Also write every frame as PNG, for debugging. Defaults to False.
     """
     if not output_dir.exists():
         output_dir.mkdir(parents=True)
 
     downsample_config = DownsampleConfig.from_str(downsample_config)
-    log.info('Downsampling config: %s', downsample_config)
+    log.info('Downsampling config: %s, backend: %s', downsample_config, backend.value)
     name_stem = video_path.stem
-    frames = get_downsampled_frames(video_path.absolute().as_posix(), downsample_config)
+    save_downsample_config(output_dir, downsample_config)
 
-    for idx, frame in enumerate(frames):
-        name = f'{name_stem}_{idx:05}.png'
-        img = Image.fromarray(frame)
-        img.save(output_dir / name)
+    # With regions of interest, each region is exported to its own sub directory.
+    if export_png:
+        for roi in downsample_config.rois:
+            (output_dir / roi.name).mkdir(exist_ok=True)
+
+    video_filename = video_path.absolute().as_posix()
+    frames = iter_downsampled_frames(video_filename, downsample_config, prefetch_depth=prefetch, backend=backend,
+                                     num_workers=num_workers)
+
+    # Frames are written out as they are decoded, only `prefetch` frames are
+    # held in memory at any point.
+    with FrameStoreWriter(output_dir, fps=get_video_fps(video_filename)) as writer:
+        for frame in frames:
+            name = f'{name_stem}_{frame.idx:05}'
+            writer.append(name, frame)
+
+            if not export_png:
+                continue
+
+            if downsample_config.crop == Crop.ROI:
+                for roi_name, region in frame.regions.items():
+                    Image.fromarray(region).save(output_dir / roi_name / f'{name}.png')
+            else:
+                img = Image.fromarray(frame.image)
+                img.save(output_dir / f'{name}.png')
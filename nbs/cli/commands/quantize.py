@@ -0,0 +1,201 @@
+import functools
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from typing_extensions import Annotated
+
+import click
+import numpy as np
+import typer
+
+from cli.reports import write_report
+from csgo_clips_autotrim.experiment_utils.config import InferenceConfig
+from csgo_clips_autotrim.feature_extraction import ROI_PRESETS, list_frame_names, read_frame, read_frame_region
+from csgo_clips_autotrim.ocr import get_ocr_input
+from csgo_clips_autotrim.quantization import QuantizationMode, compare_model_variants, get_detection_agreement, get_ocr_agreement, quantize_model
+from csgo_clips_autotrim.segmentation import elimination as elimination_segmentation
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+# `--roi` of models running on whole frames.
+_WHOLE_FRAME = 'frame'
+_ROI_CHOICE = click.Choice([*ROI_PRESETS, _WHOLE_FRAME])
+
+def _sample_frame_names(frame_dir: Path, num_frames: int, exclude: List[str] = ()) -> List[str]:
+    # Frames spread evenly over the stored ones, rather than the first seconds of a single video.
+    exclude = set(exclude)
+    names = [name for name in list_frame_names(frame_dir) if name not in exclude]
+
+    if len(names) <= num_frames:
+        return names
+
+    return [names[idx] for idx in np.linspace(0, len(names) - 1, num_frames).astype(int)]
+
+def _read_inputs(frame_dir: Path, names: List[str], roi: str, to_input: Callable[[np.ndarray], Dict[str, np.ndarray]]) -> List[Dict[str, np.ndarray]]:
+    if roi == _WHOLE_FRAME:
+        return [to_input(read_frame(frame_dir, name)) for name in names]
+
+    return [to_input(read_frame_region(frame_dir, name, ROI_PRESETS[roi])) for name in names]
+
+def _quantize_and_compare(onnx_model_path: Path, calibration_frame_dir: Path, eval_frame_dir: Optional[Path], roi: str,
+                          modes: Optional[List[QuantizationMode]], num_calibration_frames: int, num_eval_frames: int,
+                          to_input: Callable[[np.ndarray], Dict[str, np.ndarray]], output_names: List[str],
+                          get_agreement: Callable[[Dict[str, np.ndarray], Dict[str, np.ndarray]], float], output_path: Optional[Path]):
+    modes = modes or list(QuantizationMode)
+    eval_frame_dir = eval_frame_dir or calibration_frame_dir
+
+    calibration_names = _sample_frame_names(calibration_frame_dir, num_calibration_frames)
+    # Frames used for calibration are not used to evaluate the variants.
+    eval_names = _sample_frame_names(eval_frame_dir, num_eval_frames, calibration_names if eval_frame_dir == calibration_frame_dir else [])
+    logger.info('Calibrating on %d frames from %s, evaluating on %d frames from %s',
+                len(calibration_names), calibration_frame_dir, len(eval_names), eval_frame_dir)
+
+    for mode in modes:
+        calibration_inputs = None
+
+        if mode == QuantizationMode.STATIC:
+            calibration_inputs = _read_inputs(calibration_frame_dir, calibration_names, roi, to_input)
+
+        quantize_model(onnx_model_path, mode, calibration_inputs)
+
+    inference_config = InferenceConfig(mlflow_artifact_run_id='',
+                                       triton_model_name=onnx_model_path.stem,
+                                       triton_url='',
+                                       score_threshold=0.,
+                                       backend='onnxruntime',
+                                       onnx_model_path=onnx_model_path.as_posix())
+    eval_inputs = _read_inputs(eval_frame_dir, eval_names, roi, to_input)
+    reports = compare_model_variants(inference_config, [mode.model_variant for mode in modes], eval_inputs, output_names, get_agreement)
+
+    write_report({
+        'model': onnx_model_path.as_posix(),
+        'calibration_frame_dir': calibration_frame_dir.as_posix(),
+        'eval_frame_dir': eval_frame_dir.as_posix(),
+        'roi': roi,
+        'variants': reports,
+    }, output_path)
+
+@app.command()
+def detection(onnx_model_path: Annotated[Path,
+                                        typer.Option(
+                                           exists=True,
+                                           file_okay=True,
+                                           dir_okay=False,
+                                           readable=True,
+                                           resolve_path=True,
+                                        )],
+              model_run_id: str,
+              calibration_frame_dir: Annotated[Path,
+                                        typer.Option(
+                                           exists=True,
+                                           file_okay=False,
+                                           dir_okay=True,
+                                           readable=True,
+                                           resolve_path=True,
+                                        )],
+              eval_frame_dir: Annotated[Optional[Path],
+                                        typer.Option(
+                                           exists=True,
+                                           file_okay=False,
+                                           dir_okay=True,
+                                           readable=True,
+                                           resolve_path=True,
+                                        )] = None,
+              output_path: Annotated[Optional[Path],
+                                        typer.Option(
+                                           file_okay=True,
+                                           dir_okay=False,
+                                           resolve_path=True,
+                                        )] = None,
+              roi: Annotated[str, typer.Option(click_type=_ROI_CHOICE)] = 'killfeed',
+              modes: Annotated[Optional[List[QuantizationMode]], typer.Option('--mode')] = None,
+              num_calibration_frames: int = 100,
+              num_eval_frames: int = 200,
+              score_threshold: float = 0.5,
+              iou_threshold: float = 0.5):
+    """Make INT8 variants of an exported detector (elimination, weapon or
+    game state model), then compare their latency and detections with the
+    FP32 model on stored frames. The report is written as JSON.
+
+    Args:
+        onnx_model_path (Path): FP32 model, variants are written next to it.
+        model_run_id (str): mlflow run of the model, for its preprocessing pipeline.
+        calibration_frame_dir (Path): Frame store (or PNG frames) to calibrate static quantization on.
+        eval_frame_dir (Optional[Path], optional): Frames to compare the variants on. Defaults to None (the calibration frames not used for calibration).
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        roi (str, optional): Region of interest the model runs on, from `ROI_PRESETS`, or 'frame' for whole frames. Defaults to 'killfeed'.
+        modes (Optional[List[QuantizationMode]], optional): Defaults to None (all modes).
+        num_calibration_frames (int, optional): Defaults to 100.
+        num_eval_frames (int, optional): Defaults to 200.
+        score_threshold (float, optional): Defaults to 0.5.
+        iou_threshold (float, optional): IoU for detections to match the FP32 ones. Defaults to 0.5.
+    """
+    def to_input(img: np.ndarray) -> Dict[str, np.ndarray]:
+        return {'input': elimination_segmentation.preprocess_image(img, model_run_id).image}
+
+    _quantize_and_compare(onnx_model_path, calibration_frame_dir, eval_frame_dir, roi, modes, num_calibration_frames, num_eval_frames,
+                          to_input, ['dets', 'labels'],
+                          functools.partial(get_detection_agreement, score_threshold=score_threshold, iou_threshold=iou_threshold),
+                          output_path)
+
+@app.command()
+def ocr(onnx_model_path: Annotated[Path,
+                                  typer.Option(
+                                     exists=True,
+                                     file_okay=True,
+                                     dir_okay=False,
+                                     readable=True,
+                                     resolve_path=True,
+                                  )],
+        calibration_frame_dir: Annotated[Path,
+                                  typer.Option(
+                                     exists=True,
+                                     file_okay=False,
+                                     dir_okay=True,
+                                     readable=True,
+                                     resolve_path=True,
+                                  )],
+        eval_frame_dir: Annotated[Optional[Path],
+                                  typer.Option(
+                                     exists=True,
+                                     file_okay=False,
+                                     dir_okay=True,
+                                     readable=True,
+                                     resolve_path=True,
+                                  )] = None,
+        output_path: Annotated[Optional[Path],
+                                  typer.Option(
+                                     file_okay=True,
+                                     dir_okay=False,
+                                     resolve_path=True,
+                                  )] = None,
+        roi: Annotated[str, typer.Option(click_type=_ROI_CHOICE)] = _WHOLE_FRAME,
+        modes: Annotated[Optional[List[QuantizationMode]], typer.Option('--mode')] = None,
+        num_calibration_frames: int = 100,
+        num_eval_frames: int = 200,
+        input_name: str = 'x',
+        output_name: str = 'softmax_2.tmp_0'):
+    """Make INT8 variants of the exported PaddleOCR recognition model, then
+    compare their latency and recognized text with the FP32 model. The frames
+    should be text crops, like the player names of the killfeed. The report
+    is written as JSON.
+
+    Args:
+        onnx_model_path (Path): FP32 model, variants are written next to it.
+        calibration_frame_dir (Path): Frame store (or PNG frames) of text crops to calibrate static quantization on.
+        eval_frame_dir (Optional[Path], optional): Frames to compare the variants on. Defaults to None (the calibration frames not used for calibration).
+        output_path (Optional[Path], optional): Path to the JSON report. Defaults to None (stdout).
+        roi (str, optional): Region of interest to crop the frames to, from `ROI_PRESETS`, or 'frame' for whole frames. Defaults to 'frame'.
+        modes (Optional[List[QuantizationMode]], optional): Defaults to None (all modes).
+        num_calibration_frames (int, optional): Defaults to 100.
+        num_eval_frames (int, optional): Defaults to 200.
+        input_name (str, optional): Defaults to 'x'.
+        output_name (str, optional): Defaults to 'softmax_2.tmp_0'.
+    """
+    def to_input(img: np.ndarray) -> Dict[str, np.ndarray]:
+        return {input_name: get_ocr_input(img)[np.newaxis, :]}
+
+    _quantize_and_compare(onnx_model_path, calibration_frame_dir, eval_frame_dir, roi, modes, num_calibration_frames, num_eval_frames,
+                          to_input, [output_name], get_ocr_agreement, output_path)
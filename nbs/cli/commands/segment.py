@@ -1,15 +1,17 @@
+import collections
+import concurrent.futures
 import dataclasses
-import json
 import logging
 import os
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any, Dict, List, Tuple
+import numpy as np
 import tqdm
 
-import mmcv
 import typer
 
 from csgo_clips_autotrim.experiment_utils.config import InferenceConfig
+from csgo_clips_autotrim.feature_extraction import KILLFEED_ROI, batched, list_frame_names, read_frame_region
 from csgo_clips_autotrim.ocr import TritonOCR
 from csgo_clips_autotrim.segmentation import elimination as elimination_segmentation
 from csgo_clips_autotrim.segmentation import postprocessing
@@ -91,16 +93,29 @@ def elimination(image_dir_path: Annotated[Path,
                                         readable=True,
                                         resolve_path=True,
                                      )] = None,
+                  reuse_unchanged_killfeed: bool = True,
+                  killfeed_change_threshold: float = 16.,
+                  batch_size: int = 1,
+                  weapon_batch_size: int = 16,
+                  in_flight: int = 1,
+                  duplicate_iou_threshold: float = postprocessing.DUPLICATE_IOU_THRESHOLD,
+                  resume: bool = False,
+                  workers: int = 1,
                   ):
    """Extract the elimination information from the given frame.
 
    Args:
        image_dir_path (Path): Path to folder containig image to extract information from.
-       output_dir (Path): Path to output directory, with output in JSON format. Defaults to './out'.
+       output_dir (Path): Path to output directory, results are appended to its JSON Lines results store. Defaults to './out'.
+       reuse_unchanged_killfeed (bool): Reuse the result of the previous frame when the killfeed did not change. Defaults to True.
+       killfeed_change_threshold (float): Largest thumbnail difference, in intensity levels, for an unchanged killfeed. Defaults to 16.
+       batch_size (int): Number of frames segmented per elimination model request. Defaults to 1.
+       weapon_batch_size (int): Number of elimination events (of all frames in a batch) per weapon model request. Defaults to 16.
+       in_flight (int): Number of elimination model requests (batches) in flight, the next batches are read and preprocessed meanwhile. Defaults to 1.
+       duplicate_iou_threshold (float): Events overlapping a larger event of the same frame by more than this IoU are removed. Defaults to 0 (any overlap).
+       resume (bool): Skip the frames already segmented by an interrupted run with the same models, otherwise start over. Defaults to False.
+       workers (int): Threads reading and preprocessing frames and running the weapon and OCR requests of a batch concurrently. Defaults to 1.
    """
-   if not output_dir.exists():
-      output_dir.mkdir(parents=True)
-
    if elimination_inference_config_path is None:
       elimination_inference_config = default_elimination_inference_config
    else:
@@ -118,52 +133,243 @@ def elimination(image_dir_path: Annotated[Path,
    else:
       with open(ocr_inference_config_path, 'r') as f:
          ocr_inference_config = InferenceConfig.schema().load(f)
-   
+
+   run_elimination_segmentation(image_dir_path, output_dir, elimination_inference_config, weapon_inference_config, ocr_inference_config,
+                                reuse_unchanged_killfeed=reuse_unchanged_killfeed, killfeed_change_threshold=killfeed_change_threshold,
+                                batch_size=batch_size, weapon_batch_size=weapon_batch_size, in_flight=in_flight,
+                                duplicate_iou_threshold=duplicate_iou_threshold, resume=resume, workers=workers)
+
+def run_elimination_segmentation(image_dir_path: Path, output_dir: Path, elimination_inference_config: InferenceConfig,
+                                 weapon_inference_config: InferenceConfig, ocr_inference_config: InferenceConfig,
+                                 reuse_unchanged_killfeed: bool = True, killfeed_change_threshold: float = 16.,
+                                 batch_size: int = 1, weapon_batch_size: int = 16, in_flight: int = 1,
+                                 duplicate_iou_threshold: float = postprocessing.DUPLICATE_IOU_THRESHOLD,
+                                 resume: bool = False, workers: int = 1):
+   """Segment the elimination events of the frames in `image_dir_path` with
+   the given models, as `segment elimination` does (see it for the other
+   arguments), appending the results to the store of `output_dir`.
+   """
+   if not output_dir.exists():
+      output_dir.mkdir(parents=True)
+
    ocr = TritonOCR(ocr_inference_config)
+   elimination_segmentation.warmup_test_pipelines([elimination_inference_config.mlflow_artifact_run_id,
+                                                   weapon_inference_config.mlflow_artifact_run_id])
+
+   segmentation_run = _get_segmentation_run(elimination_inference_config, weapon_inference_config, ocr_inference_config, duplicate_iou_threshold,
+                                            reuse_unchanged_killfeed, killfeed_change_threshold)
+   completed_results = elimination_segmentation.start_segmentation_run(output_dir, segmentation_run, resume)
+   completed_names = {result.frame_info.name for result in completed_results.values()}
+   frame_names = [name_stem for name_stem in list_frame_names(image_dir_path) if name_stem not in completed_names]
+
+   if completed_names:
+      logger.info('Skipping %d frames segmented by the interrupted run, %d remaining.', len(completed_names), len(frame_names))
+
+   change_detector = elimination_segmentation.KillfeedChangeDetector(threshold=killfeed_change_threshold)
+   previous_result = None
+
+   if in_flight > 1:
+      # Every request in flight needs its own connection.
+      elimination_inference_config = dataclasses.replace(elimination_inference_config,
+                                                         triton_concurrency=max(in_flight, elimination_inference_config.triton_concurrency))
+
+   def finish_batch(pending_batch: _PendingBatch):
+      nonlocal previous_result
+      segmentation_results = _finish_batch(executor, pending_batch, weapon_inference_config, ocr, weapon_batch_size, duplicate_iou_threshold)
+
+      # Frames that failed are not stored (and segmented again by a resumed
+      # run). The next frame read counts as changed, rather than reusing them.
+      if len(segmentation_results) < sum(pending_batch.changed):
+         change_detector.reset()
+
+      for name_stem, is_changed in zip(pending_batch.frame_names, pending_batch.changed):
+         image_path = image_dir_path / f'{name_stem}.png'
+
+         if is_changed:
+            previous_result = segmentation_result = segmentation_results.get(name_stem)
+
+            if segmentation_result is None:
+               continue
+         elif previous_result is None:
+            logger.warning('Killfeed of frame: %s is unchanged since a frame that failed, skipping.', name_stem)
+            continue
+         else:
+            segmentation_result = dataclasses.replace(previous_result, frame_info=elimination_segmentation.get_frame_info(image_path))
+
+         results_writer.append(segmentation_result)
+
+      # Finished batches are visible to readers of the store.
+      results_writer.flush()
+      progress_bar.update(len(pending_batch.frame_names))
+
+   pending_batches = collections.deque()
+
+   # Tasks are only submitted from this thread, and their results collected in
+   # submission order, so the output does not depend on the number of workers.
+   # Inference clients are per thread, the OCR is shared.
+   executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='segment')
+
+   with executor, tqdm.tqdm(total=len(frame_names)) as progress_bar, elimination_segmentation.SegmentationResultsWriter(output_dir) as results_writer:
+      for batch_names in batched(frame_names, batch_size):
+         # Only the killfeed (top right quadrant) is decoded, when the preprocess
+         # stage stored regions of interest it is read directly. Frames that
+         # can not be read are skipped.
+         read_frames = _get_completed(batch_names, [executor.submit(read_frame_region, image_dir_path, name_stem, roi=KILLFEED_ROI)
+                                                    for name_stem in batch_names], 'read')
+         progress_bar.update(len(batch_names) - len(read_frames))
+         batch_names = [batch_names[pos] for pos, _ in read_frames]
+         cropped_inputs = [cropped_input for _, cropped_input in read_frames]
+
+         if not batch_names:
+            continue
+
+         # The first frame always counts as changed, so every unchanged frame
+         # has a previous result (in this or an earlier batch) to reuse.
+         changed = [not reuse_unchanged_killfeed or change_detector.has_changed(cropped_input) for cropped_input in cropped_inputs]
+         pending_batches.append(_submit_batch(executor, image_dir_path, batch_names, changed, cropped_inputs, elimination_inference_config))
+
+         # Batches are finished in order, while the later ones are at the server.
+         if len(pending_batches) >= in_flight:
+            finish_batch(pending_batches.popleft())
+
+      while pending_batches:
+         finish_batch(pending_batches.popleft())
+
+   if reuse_unchanged_killfeed:
+      logger.info('Killfeed unchanged in %d/%d frames (hit rate: %.1f%%), reused previous results.',
+                  change_detector.num_unchanged, change_detector.num_frames, 100 * change_detector.hit_rate)
+
+def _get_segmentation_run(elimination_inference_config: InferenceConfig, weapon_inference_config: InferenceConfig,
+                          ocr_inference_config: InferenceConfig, duplicate_iou_threshold: float,
+                          reuse_unchanged_killfeed: bool, killfeed_change_threshold: float) -> dict:
+   # Results can only be resumed by a run with the same models and thresholds,
+   # and the same reuse of results for unchanged killfeeds.
+   models = {name: {'run_id': config.mlflow_artifact_run_id, 'model_variant': config.model_variant, 'score_threshold': config.score_threshold}
+             for name, config in (('elimination', elimination_inference_config),
+                                  ('weapon', weapon_inference_config),
+                                  ('ocr', ocr_inference_config))}
+
+   # The change threshold only matters when results are reused.
+   return {'models': models, 'duplicate_iou_threshold': duplicate_iou_threshold,
+           'reuse_unchanged_killfeed': reuse_unchanged_killfeed,
+           'killfeed_change_threshold': killfeed_change_threshold if reuse_unchanged_killfeed else None}
+
+def _get_completed(frame_names: List[str], futures: List[concurrent.futures.Future], action: str) -> List[Tuple[int, Any]]:
+   # Positions and results of the frames whose task succeeded, a failed task only skips its frame.
+   completed = []
+
+   for frame_pos, (name_stem, future) in enumerate(zip(frame_names, futures)):
+      try:
+         completed.append((frame_pos, future.result()))
+      except Exception:
+         logger.warning('Failed to %s frame: %s, skipping.', action, name_stem, exc_info=True)
+
+   return completed
+
+@dataclasses.dataclass
+class _PendingBatch:
+   frame_names: List[str]
+   changed: List[bool]
+   # Frames with a changed killfeed that are segmented, the others failed.
+   segmented_names: List[str]
+   segmented_cropped_inputs: List[np.ndarray]
+   segmentation: elimination_segmentation.PendingInference
+
+def _submit_batch(executor: concurrent.futures.Executor, image_dir_path: Path, frame_names: List[str], changed: List[bool],
+                  cropped_inputs: List[np.ndarray], elimination_inference_config: InferenceConfig) -> _PendingBatch:
+   # Only frames with a changed killfeed are segmented.
+   changed_names = [name_stem for name_stem, is_changed in zip(frame_names, changed) if is_changed]
+   changed_cropped_inputs = [cropped_input for cropped_input, is_changed in zip(cropped_inputs, changed) if is_changed]
+
+   preprocessed = _get_completed(changed_names, [executor.submit(elimination_segmentation.preprocess_image, cropped_input,
+                                                                 elimination_inference_config.mlflow_artifact_run_id)
+                                                 for cropped_input in changed_cropped_inputs], 'preprocess')
+   segmented_names = [changed_names[frame_pos] for frame_pos, _ in preprocessed]
+   segmented_cropped_inputs = [changed_cropped_inputs[frame_pos] for frame_pos, _ in preprocessed]
+   image_paths = [image_dir_path / f'{name_stem}.png' for name_stem in segmented_names]
+
+   try:
+      segmentation = elimination_segmentation.segment_elimination_events_async([preprocess_result for _, preprocess_result in preprocessed],
+                                                                               image_paths, elimination_inference_config)
+   except Exception:
+      logger.warning('Failed to send the elimination model request of frames: %s, skipping.', ', '.join(segmented_names), exc_info=True)
+      segmented_names, segmented_cropped_inputs = [], []
+      segmentation = elimination_segmentation.PendingInference(None, lambda _: [])
+
+   return _PendingBatch(frame_names, changed, segmented_names, segmented_cropped_inputs, segmentation)
+
+def _finish_batch(executor: concurrent.futures.Executor, pending_batch: _PendingBatch, weapon_inference_config: InferenceConfig, ocr: TritonOCR,
+                  weapon_batch_size: int, duplicate_iou_threshold: float) -> Dict[str, elimination_segmentation.EliminationSegmentationResult]:
+   frame_names = pending_batch.segmented_names
+   cropped_inputs = pending_batch.segmented_cropped_inputs
+
+   # A failed request only skips the frames of its batch.
+   try:
+      segmentation_results = pending_batch.segmentation.get_result()
+   except Exception:
+      logger.warning('Failed to segment the elimination events of frames: %s, skipping.', ', '.join(frame_names), exc_info=True)
+      return {}
 
-   images = image_dir_path.glob('*.png')
+   # The weapon model runs on the events of all frames together.
+   frame_events = [(frame_pos, event) for frame_pos, segmentation_result in enumerate(segmentation_results)
+                   for event in segmentation_result.elimination_events]
+   events_with_added_info = [[] for _ in segmentation_results]
 
-   for image_path in tqdm.tqdm(images):
-      name_stem = image_path.stem
-      json_path = output_dir / f'{name_stem}.json'
+   # Weapon batches and the OCR of every event run concurrently on the workers.
+   weapon_batches = [(weapon_batch_events, executor.submit(_segment_weapons, frame_names, cropped_inputs, weapon_batch_events, weapon_inference_config))
+                     for weapon_batch_events in batched(frame_events, weapon_batch_size)]
+   recognitions = []
 
-      input_img = mmcv.imread(image_path)
-      input_rgb = mmcv.imconvert(input_img, 'bgr', 'rgb')
+   for weapon_batch_events, weapon_batch in weapon_batches:
+      # A failed weapon batch only drops its events.
+      try:
+         weapon_segmentation_results = weapon_batch.result()
+      except Exception:
+         logger.warning('Failed to segment weapons of %d elimination events in frames: %s, skipping.', len(weapon_batch_events),
+                        ', '.join(sorted({frame_names[frame_pos] for frame_pos, _ in weapon_batch_events})), exc_info=True)
+         continue
 
-      height, width, channels = input_rgb.shape
-      mid_height, mid_width = height // 2, width // 2
-      cropped_input = input_rgb[:mid_height, mid_width:, :]
+      for frame_pos, weapon_segmentation_result in weapon_segmentation_results:
+         if weapon_segmentation_result.error is not None:
+            logger.warning('Failed assertion while extracting result from event in frame: %s (%s), skipping.',
+                           frame_names[frame_pos], weapon_segmentation_result.error)
+            continue
 
-      preprocess_result = elimination_segmentation.preprocess_image(cropped_input, elimination_inference_config.mlflow_artifact_run_id)
-      segmentation_result = elimination_segmentation.segment_elimination_events(preprocess_result, image_path, elimination_inference_config)
+         recognition = executor.submit(elimination_segmentation.recognize_players, weapon_segmentation_result.elimination_event, cropped_inputs[frame_pos], ocr)
+         recognitions.append((frame_pos, recognition))
 
-      events_with_added_info = []
+   # A failed event only drops that event.
+   for frame_pos, recognition in recognitions:
+      try:
+         events_with_added_info[frame_pos].append(recognition.result())
+      except:
+         logger.warning('Failed to segment result from given elimination event in frame: %s, skipping.', frame_names[frame_pos])
 
-      for event in segmentation_result.elimination_events:
-         try:
-            weapon_segmentation_input = elimination_segmentation.get_weapon_segmentation_input(cropped_input, event)
-            weapon_segmentation_input_prep = elimination_segmentation.preprocess_image(weapon_segmentation_input, weapon_inference_config.mlflow_artifact_run_id)
-            weapon_segmentation_result = elimination_segmentation.segment_weapon(event, weapon_segmentation_input_prep, weapon_inference_config)
-            player_recognition_result = elimination_segmentation.recognize_players(weapon_segmentation_result, cropped_input, ocr)
+   # Duplicates are removed for all frames of the batch at once.
+   return dict(zip(frame_names, postprocessing.remove_duplicate_events_batch([dataclasses.replace(segmentation_result, elimination_events=events)
+                                                                              for segmentation_result, events in zip(segmentation_results, events_with_added_info)],
+                                                                             duplicate_iou_threshold)))
 
-            events_with_added_info.append(player_recognition_result)
-         except AssertionError:
-            logger.warning('Failed assertion while extracting result from event in frame: %s, skipping.', name_stem)
-         except:
-            logger.warning('Failed to segment result from given elimination event in frame: %s, skipping.', name_stem)
-      
-      segmentation_result = dataclasses.replace(segmentation_result, elimination_events=events_with_added_info)
-      segmentation_result = postprocessing.remove_duplicate_events(segmentation_result)
+def _segment_weapons(frame_names: List[str], cropped_inputs: List[np.ndarray], frame_events: List[tuple],
+                     weapon_inference_config: InferenceConfig) -> List[tuple]:
+   # Events whose input can not be prepared are skipped, the others are segmented in a single request.
+   prepared = []
 
-      data = {}
-      # If the json already exists, append data to it.
-      if json_path.exists():
-         with open(json_path, 'r') as f:
-            data = json.load(f)
+   for frame_pos, event in frame_events:
+      try:
+         weapon_segmentation_input = elimination_segmentation.get_weapon_segmentation_input(cropped_inputs[frame_pos], event)
+         weapon_segmentation_input_prep = elimination_segmentation.preprocess_image(weapon_segmentation_input, weapon_inference_config.mlflow_artifact_run_id)
+         prepared.append((frame_pos, event, weapon_segmentation_input_prep))
+      except:
+         logger.warning('Failed to segment result from given elimination event in frame: %s, skipping.', frame_names[frame_pos])
 
-         data['elimination_events'] = segmentation_result.to_dict()['elimination_events']
-      else:
-         data = segmentation_result.to_dict()
+   try:
+      weapon_segmentation_results = elimination_segmentation.segment_weapons([event for _, event, _ in prepared],
+                                                                             [prep for _, _, prep in prepared],
+                                                                             weapon_inference_config)
+   except:
+      logger.warning('Failed to segment weapons of %d elimination events in frames: %s, skipping.',
+                     len(prepared), ', '.join(sorted({frame_names[frame_pos] for frame_pos, _, _ in prepared})))
+      return []
 
-      with open(json_path, 'w') as f:
-         json.dump(data, f, indent=4)
+   return [(frame_pos, result) for (frame_pos, _, _), result in zip(prepared, weapon_segmentation_results)]
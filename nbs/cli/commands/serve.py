@@ -0,0 +1,231 @@
+import contextlib
+import io
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+from typing_extensions import Annotated
+
+import click
+import typer
+
+from cli.client import SOCKET_ENV_VAR, get_socket_path, iter_messages, send_message
+from cli.main import LOG_FORMAT
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+# Subcommands imported, with the models of their defaults loaded, before the
+# daemon accepts commands.
+WARM_SUBCOMMANDS = ['prep', 'segment', 'clutch', 'worker']
+
+class _ClientStream(io.TextIOBase):
+    """Text stream sending what is written to the client, as output of the
+    given stream. The command keeps running when the client goes away."""
+
+    def __init__(self, sock: socket.socket, stream: str):
+        self._sock = sock
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._disconnected = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        # Like other text streams, so click does not take it for a binary one.
+        if not isinstance(data, str):
+            raise TypeError(f'write() argument must be str, not {type(data).__name__}')
+
+        with self._lock:
+            if data and not self._disconnected:
+                try:
+                    send_message(self._sock, {'stream': self._stream, 'data': data})
+                except OSError:
+                    self._disconnected = True
+
+        return len(data)
+
+def _invoke(command: click.Command, args: List[str]) -> int:
+    # In standalone mode click reports usage errors itself, and always exits.
+    try:
+        command.main(args=args, prog_name='autotrim', standalone_mode=True, obj={'daemon': True})
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else int(e.code is not None)
+    except Exception:
+        logger.exception('Command failed: %s', ' '.join(args))
+        return 1
+
+    return 0
+
+class _CommandHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        request = next(iter_messages(self.request), None)
+
+        if request is None:
+            return
+
+        exit_code = self.server.run_command(request['args'], Path(request['cwd']), self.request)
+
+        with contextlib.suppress(OSError):
+            send_message(self.request, {'exit_code': exit_code})
+
+class CommandServer(socketserver.ThreadingUnixStreamServer):
+    """Runs command lines of the CLI sent by `cli.client`, in this process,
+    so imports, model configs and inference clients are reused by the
+    following commands. Output and logs of a command are streamed back to its
+    client."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, command: click.Command):
+        super().__init__(os.fspath(socket_path), _CommandHandler)
+        # Anyone able to connect can run commands as this user.
+        os.chmod(socket_path, stat.S_IRUSR | stat.S_IWUSR)
+        self._command = command
+        # Commands change the working directory and the standard streams of
+        # the process, they run one at a time. They all run on the same
+        # long-lived thread, so the per-thread inference clients (and their
+        # connections) are reused by the following commands. The thread of a
+        # connection only waits for its command, other clients wait their turn.
+        self._commands = queue.Queue()
+        self._command_thread = threading.Thread(target=self._run_commands, name='command', daemon=True)
+        self._command_thread.start()
+
+    def run_command(self, args: List[str], cwd: Path, sock: socket.socket) -> int:
+        exit_code = queue.Queue(maxsize=1)
+        self._commands.put((args, cwd, sock, exit_code))
+
+        return exit_code.get()
+
+    def _run_commands(self):
+        while True:
+            args, cwd, sock, exit_code = self._commands.get()
+
+            try:
+                exit_code.put(self._run_command(args, cwd, sock))
+            except Exception:
+                logger.exception('Failed to run: %s', ' '.join(args))
+                exit_code.put(1)
+
+    def _run_command(self, args: List[str], cwd: Path, sock: socket.socket) -> int:
+        stdout, stderr = _ClientStream(sock, 'stdout'), _ClientStream(sock, 'stderr')
+
+        logger.info('Running: %s, in: %s', ' '.join(args), cwd)
+        root_logger = logging.getLogger()
+        log_level = root_logger.level
+        log_handler = logging.StreamHandler(stderr)
+        log_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root_logger.addHandler(log_handler)
+        previous_cwd = os.getcwd()
+        tic = time.perf_counter()
+
+        try:
+            os.chdir(cwd)
+
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                exit_code = _invoke(self._command, args)
+        finally:
+            os.chdir(previous_cwd)
+            root_logger.removeHandler(log_handler)
+            root_logger.setLevel(log_level)
+            _close_frame_stores()
+
+        logger.info('Finished with exit code: %d in %f seconds', exit_code, time.perf_counter() - tic)
+
+        return exit_code
+
+def _close_frame_stores():
+    # Frame stores cached by a command keep their files mapped, so the disk
+    # space of the work dirs deleted since (like `worker`'s) stays in use for
+    # as long as the daemon runs. The module is loaded by warm-up anyway.
+    from csgo_clips_autotrim.feature_extraction import close_frame_stores
+
+    close_frame_stores()
+
+def _is_listening(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(os.fspath(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+    return True
+
+def _interrupt(signum: int, frame):
+    raise KeyboardInterrupt()
+
+def _warm_up(ctx: click.Context, command: click.Group):
+    tic = time.perf_counter()
+
+    for name in WARM_SUBCOMMANDS:
+        command.get_command(ctx, name)
+
+    try:
+        from cli.commands import clutch, segment
+        from csgo_clips_autotrim.segmentation import elimination as elimination_segmentation
+
+        elimination_segmentation.warmup_test_pipelines([segment.default_elimination_inference_config.mlflow_artifact_run_id,
+                                                        segment.default_weapon_inference_config.mlflow_artifact_run_id,
+                                                        clutch.default_game_state_inference_config.mlflow_artifact_run_id])
+    except Exception:
+        logger.warning('Failed to load the default models, the first command using them will.', exc_info=True)
+
+    logger.info('Warmed up in %f seconds', time.perf_counter() - tic)
+
+@app.callback(invoke_without_command=True)
+def serve(ctx: typer.Context,
+          socket_path: Annotated[Optional[Path],
+                                typer.Option(
+                                   envvar=SOCKET_ENV_VAR,
+                                   dir_okay=False,
+                                   resolve_path=True,
+                                )] = None,
+          warm_up: bool = True):
+    """Run as a daemon, executing the command lines sent by
+    `autotrim-client.sh` over a Unix socket. Imports, model configs and
+    inference clients stay loaded between commands, so short commands start
+    right away. Commands run one at a time, with the environment of the
+    daemon.
+
+    Args:
+        socket_path (Optional[Path], optional): Defaults to None (AUTOTRIM_SOCKET or '<tmp>/autotrim.sock').
+        warm_up (bool, optional): Import the pipeline commands and load their default models before accepting commands. Defaults to True.
+    """
+    if isinstance(ctx.obj, dict) and ctx.obj.get('daemon'):
+        logger.error('The daemon does not run `serve`.')
+        raise typer.Exit(code=2)
+
+    socket_path = socket_path or get_socket_path()
+
+    if _is_listening(socket_path):
+        logger.error('A daemon is already listening on: %s', socket_path)
+        raise typer.Exit(code=1)
+
+    # Left behind by a daemon that did not shut down cleanly.
+    socket_path.unlink(missing_ok=True)
+    root_ctx = ctx.find_root()
+
+    if warm_up:
+        _warm_up(root_ctx, root_ctx.command)
+
+    # Stopped containers get SIGTERM, the socket is removed as on Ctrl-C.
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    with CommandServer(socket_path, root_ctx.command) as server:
+        logger.info('Listening on: %s', socket_path)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info('Shutting down.')
+        finally:
+            socket_path.unlink(missing_ok=True)
@@ -1,7 +1,7 @@
 import json
 import logging
 from pathlib import Path
-import pathlib
+import shutil
 import tempfile
 import time
 from typing import List
@@ -12,8 +12,7 @@ import typer
 from PIL import Image
 
 from csgo_clips_autotrim.experiment_utils.config import DBConfig, StorageConfig
-from csgo_clips_autotrim.autotrim import TimelineEvent
-from cli.commands import segment, preprocess, clutch
+from csgo_clips_autotrim.feature_extraction import load_downsample_config, read_frame, DecodeBackend, DownsampleConfig, FrameStore
 from cli.database import Database
 from cli.storage import S3BlobStorage
 from cli.models import IngestEntry, ResultEntry
@@ -51,7 +50,38 @@ def worker(source_dir: Annotated[Path,
                                 writable=False,
                                 readable=True,
                                 resolve_path=True,
-                                )] = None):
+                                )] = None,
+          prefetch: int = 4,
+          decode_backend: DecodeBackend = DecodeBackend.OPENCV,
+          decode_workers: int = 1,
+          downsample_config: str = 'downsample_1280x720_60_RGB',
+          scratch_dir: Annotated[Path,
+                                typer.Option(
+                                file_okay=False,
+                                dir_okay=True,
+                                writable=True,
+                                resolve_path=True,
+                                envvar='AUTOTRIM_SCRATCH_DIR'
+                                )] = Path(tempfile.gettempdir()) / 'autotrim',
+          resume_running: bool = False,
+          retry_failed: bool = False):
+    """Work on one accepted ingest entry: downsample, segment and detect
+    clutches, then store the results. The work dir is kept on scratch space,
+    by ingest id, until the entry succeeded, so an entry retried with
+    `--retry-failed` resumes from the completed frames.
+
+    Args:
+        source_dir (Path): Directory the ingested video paths are relative to.
+        db_config_path (Path, optional): Defaults to None (from the environment).
+        storage_config_path (Path, optional): Defaults to None (from the environment).
+        prefetch (int, optional): Number of frames decoded ahead of the writer. Defaults to 4.
+        decode_backend (DecodeBackend, optional): Defaults to DecodeBackend.OPENCV.
+        decode_workers (int, optional): Processes decoding the video. Defaults to 1.
+        downsample_config (str, optional): Defaults to 'downsample_1280x720_60_RGB'.
+        scratch_dir (Path, optional): Persistent directory for the work dirs. Defaults to '<tmp>/autotrim'.
+        resume_running (bool, optional): Also pick up entries left running by a crashed worker. Only safe with a single worker. Defaults to False.
+        retry_failed (bool, optional): Pick up a failed entry when no other entry is waiting, resuming from its work dir. Defaults to False.
+    """
     if not source_dir.exists():
         logger.error('Source dir: %s does not exist.', source_dir.as_posix())
         raise ValueError()
@@ -69,91 +99,117 @@ def worker(source_dir: Annotated[Path,
             storage_config = DBConfig.schema().load(f)
     
     db = Database(db_config)
-    storage = S3BlobStorage(endpoint_url=storage_config.endpoint_url)
 
     # Get one ingest task.
-    candidates = IngestEntry.search_ingest_entry(db, status=(TaskStatus.ACCEPTED,), limit=1)
+    statuses = (TaskStatus.ACCEPTED, TaskStatus.RUNNING) if resume_running else (TaskStatus.ACCEPTED,)
+    candidates = IngestEntry.search_ingest_entry(db, status=statuses, limit=1)
+
+    # Failed entries are only retried when no other entry is waiting, so an
+    # entry that keeps failing does not block the queue.
+    if not candidates and retry_failed:
+        candidates = IngestEntry.search_ingest_entry(db, status=(TaskStatus.FAILED,), limit=1)
+
     logger.info('Got %d candidates from db.', len(candidates))
 
     if not candidates:
         logger.info('No ingest entry remaining to work on.')
         return
     
+    # The pipeline commands and the blob storage (with their dependencies) are
+    # only imported once there is an entry to work on.
+    from csgo_clips_autotrim.autotrim import TimelineEvent
+    from cli.commands import segment, preprocess, clutch
+
+    storage = S3BlobStorage(endpoint_url=storage_config.endpoint_url)
+
     ingest_entry = candidates[0]
     ingest_entry.status = TaskStatus.RUNNING
     ingest_entry.save(db)
     logger.info('Working on ingest entry: %s', ingest_entry)
 
     try:
-        with tempfile.TemporaryDirectory(prefix='autotrim-', ) as work_dir:
-            logger.info('Wok dir: %s', work_dir)
-            video_path = source_dir / ingest_entry.path
-
-            work_dir = pathlib.Path(work_dir)
-            frame_dir = work_dir / 'frames'
-            segmenation_results_dir = work_dir / 'segmentation-results'
-
-            # Step 1. Get downsampled frames.
+        # Partial work of an earlier attempt at this entry is resumed.
+        work_dir = scratch_dir / str(ingest_entry.ingest_id)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        logger.info('Work dir: %s', work_dir)
+        video_path = source_dir / ingest_entry.path
+
+        frame_dir = work_dir / 'frames'
+        segmenation_results_dir = work_dir / 'segmentation-results'
+
+        # Step 1. Get downsampled frames. The frame store index is only written
+        # once all frames are, a complete store of an earlier attempt is reused.
+        if FrameStore.exists(frame_dir) and load_downsample_config(frame_dir) == DownsampleConfig.from_str(downsample_config):
+            logger.info('Reusing downsampled frames in: %s', frame_dir)
+        else:
             try:
                 tic = time.perf_counter()
-                preprocess.downsample(video_path, output_dir=frame_dir)
+                preprocess.downsample(video_path, output_dir=frame_dir, downsample_config=downsample_config, prefetch=prefetch, backend=decode_backend,
+                                      num_workers=decode_workers)
                 toc = time.perf_counter()
                 logger.info('Finished preprocessing in %f seconds', toc - tic)
             except:
                 logger.exception('Failed to get downsampled frames.')
                 raise
 
-            # Step 2. Elimination segmentation.
-            try:
-                tic = time.perf_counter()
-                segment.elimination(frame_dir, output_dir=segmenation_results_dir)
-                toc = time.perf_counter()
-                logger.info('Finished segmentation elimination in %f seconds', toc - tic)
-            except:
-                logger.exception('Failed to get segmentation results.')
-                raise
-            
-            # Step 3. Perform clutch detection.
-            try:
-                tic = time.perf_counter()
-                clutch.detect(work_dir=work_dir)
-                toc = time.perf_counter()
-                logger.info('Finished clutch detection in %f seconds', toc - tic)
-            except:
-                logger.exception('Failed to perform clutch detection.')
-                raise
-
-            # Store a few result artifacts:
-            # 1. Clutch detection result JSON (in DB)
-            # 2. Timeline (in DB)
-            # 3. Timeline frames (in blobstore)
-            timeline_result_path = work_dir / 'timeline.json'
-            timeline_result = json.loads(timeline_result_path.read_text())
-
-            clutch_detection_result = None
-            clutch_detection_result_path = work_dir / 'clutch_result.json'
-
-            if clutch_detection_result_path.exists():
-                clutch_detection_result = json.loads(clutch_detection_result_path.read_text())
-            
-            result_entry = ResultEntry(ingest_id=ingest_entry.ingest_id,
-                                       timeline=timeline_result,
-                                       clutch_detection_result=clutch_detection_result)
-            result_entry.save(db)
-
-            timeline_events: List[TimelineEvent] = [
-                TimelineEvent.from_dict(x) for x in timeline_result['timeline']
-            ]
-
-            # Upload timeline frames to blob store.
-            for event in timeline_events:
-                frame_path = frame_dir / f'{event.frame_info.name}.png'
-                storage.put(frame_path,
-                            storage_config.bucket_prefix + f'/ingests/{ingest_entry.ingest_id}/timeline/{frame_path.name}')
+        # Step 2. Elimination segmentation.
+        try:
+            tic = time.perf_counter()
+            segment.elimination(frame_dir, output_dir=segmenation_results_dir, resume=True)
+            toc = time.perf_counter()
+            logger.info('Finished segmentation elimination in %f seconds', toc - tic)
+        except:
+            logger.exception('Failed to get segmentation results.')
+            raise
+        
+        # Step 3. Perform clutch detection.
+        try:
+            tic = time.perf_counter()
+            clutch.detect(work_dir=work_dir)
+            toc = time.perf_counter()
+            logger.info('Finished clutch detection in %f seconds', toc - tic)
+        except:
+            logger.exception('Failed to perform clutch detection.')
+            raise
+
+        # Store a few result artifacts:
+        # 1. Clutch detection result JSON (in DB)
+        # 2. Timeline (in DB)
+        # 3. Timeline frames (in blobstore)
+        timeline_result_path = work_dir / 'timeline.json'
+        timeline_result = json.loads(timeline_result_path.read_text())
+
+        clutch_detection_result = None
+        clutch_detection_result_path = work_dir / 'clutch_result.json'
+
+        if clutch_detection_result_path.exists():
+            clutch_detection_result = json.loads(clutch_detection_result_path.read_text())
+        
+        result_entry = ResultEntry(ingest_id=ingest_entry.ingest_id,
+                                   timeline=timeline_result,
+                                   clutch_detection_result=clutch_detection_result)
+        result_entry.save(db)
+
+        timeline_events: List[TimelineEvent] = [
+            TimelineEvent.from_dict(x) for x in timeline_result['timeline']
+        ]
+
+        # Upload timeline frames to blob store, frames are only encoded
+        # to PNG here.
+        timeline_dir = work_dir / 'timeline'
+        timeline_dir.mkdir(exist_ok=True)
+
+        for event in timeline_events:
+            frame_path = timeline_dir / f'{event.frame_info.name}.png'
+            Image.fromarray(read_frame(frame_dir, event.frame_info.name)).save(frame_path)
+            storage.put(frame_path,
+                        storage_config.bucket_prefix + f'/ingests/{ingest_entry.ingest_id}/timeline/{frame_path.name}')
 
         ingest_entry.status = TaskStatus.SUCCESS
         ingest_entry.save(db)
+
+        shutil.rmtree(work_dir, ignore_errors=True)
     except:
-        logger.info('Storing task status to FAILED')
+        logger.info('Storing task status to FAILED, keeping work dir: %s', work_dir)
         ingest_entry.status = TaskStatus.FAILED
         ingest_entry.save(db)
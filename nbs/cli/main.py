@@ -1,23 +1,81 @@
+import functools
+import importlib
 import logging
+from typing import List, Optional
 
+import click
 import typer
+from typer.core import TyperGroup
 
-from cli.commands import preprocess, segment, clutch, ingest, worker
-
-app = typer.Typer()
 logger = logging.getLogger(__name__)
 
-# Subcommands
-app.add_typer(preprocess.app, name='prep')
-app.add_typer(segment.app, name='segment')
-app.add_typer(clutch.app, name='clutch')
-app.add_typer(ingest.app, name='ingest')
-app.add_typer(worker.app, name='worker')
+LOG_FORMAT = '[%(levelname)8s] %(asctime)s %(filename)16s:L%(lineno)-3d %(funcName)16s() : %(message)s'
+
+# Subcommands, by name: the module defining their app, and their help. Modules
+# are only imported when their subcommand runs, so a command does not pay for
+# the dependencies (torch, mmcv, tritonclient, boto3, ...) of the others.
+SUBCOMMANDS = {
+    'prep': ('cli.commands.preprocess', 'Downsample videos into frame stores.'),
+    'segment': ('cli.commands.segment', 'Segment the elimination events of the killfeed.'),
+    'clutch': ('cli.commands.clutch', 'Detect clutches from segmentation results.'),
+    'ingest': ('cli.commands.ingest', 'Queue the videos of a source dir for the workers.'),
+    'worker': ('cli.commands.worker', 'Work on one ingested video.'),
+    'bench': ('cli.commands.bench', 'Benchmark the stages of the pipeline.'),
+    'quantize': ('cli.commands.quantize', 'Make INT8 variants of the ONNX models.'),
+    'artifacts': ('cli.commands.artifacts', 'Manage the local cache of model artifacts.'),
+    'serve': ('cli.commands.serve', 'Run commands sent over a Unix socket, with models kept loaded.'),
+}
+
+@functools.lru_cache(maxsize=None)
+def _load_subcommand(name: str) -> click.Command:
+    module_name, _ = SUBCOMMANDS[name]
+
+    # Built the way `add_typer` would.
+    parent = typer.Typer()
+    parent.add_typer(importlib.import_module(module_name).app, name=name)
+
+    return typer.main.get_group(parent).commands[name]
+
+class LazyTyperGroup(TyperGroup):
+    """Group importing the module of a subcommand only when it is resolved.
+    Listing the subcommands in the help does not import them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formatting_help = False
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted({*super().list_commands(ctx), *SUBCOMMANDS})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in SUBCOMMANDS:
+            return super().get_command(ctx, cmd_name)
+
+        if self._formatting_help:
+            _, help = SUBCOMMANDS[cmd_name]
+            return click.Command(cmd_name, help=help)
+
+        return _load_subcommand(cmd_name)
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self._formatting_help = True
+
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self._formatting_help = False
+
+app = typer.Typer(cls=LazyTyperGroup)
 
 @app.callback()
 def main_callback(ctx: typer.Context, log_level: str = typer.Option("INFO", "--log-level")):
-    logging.basicConfig(format='[%(levelname)8s] %(asctime)s %(filename)16s:L%(lineno)-3d %(funcName)16s() : %(message)s', level=log_level)
-    pass
+    # Commands run by `autotrim serve` log through the handlers of the daemon.
+    if isinstance(ctx.obj, dict) and ctx.obj.get('daemon'):
+        logging.getLogger().setLevel(log_level)
+        return
+
+    # The subcommand is imported before this runs, its modules may have configured logging already.
+    logging.basicConfig(format=LOG_FORMAT, level=log_level, force=True)
 
 if __name__ == '__main__':
     app()
@@ -0,0 +1,21 @@
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def write_report(report: dict, output_path: Optional[Path] = None):
+    """Write a report of a command as JSON.
+
+    Args:
+        report (dict)
+        output_path (Optional[Path], optional): Defaults to None (stdout).
+    """
+    report = json.dumps(report, indent=4)
+
+    if output_path is None:
+        print(report)
+    else:
+        output_path.write_text(report)
+        logger.info('Wrote report to: %s', output_path.as_posix())
@@ -0,0 +1,113 @@
+"""Stand-in for the Triton server: a minimal HTTP/1.1 server implementing
+the inference endpoint of the KServe v2 protocol used by Triton, to benchmark
+the clients without a GPU or models. Every request is answered (as JSON) with
+the outputs returned by `respond` for the request header, after an optional
+artificial `latency`. By default it returns no detections, in the output
+format of the detection models.
+"""
+import contextlib
+import http.server
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from tritonclient.utils import np_to_triton_dtype
+
+def empty_detections(request: dict) -> Dict[str, np.ndarray]:
+    batch_size = request['inputs'][0]['shape'][0]
+
+    return {
+        'dets': np.zeros((batch_size, 0, 5), dtype=np.float32),
+        'labels': np.zeros((batch_size, 0), dtype=np.int64),
+    }
+
+class _StandInRequestHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1, so connections are kept alive between requests.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes, with Nagle's algorithm the body
+    # waits for the client's (delayed) ACK of the headers.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload: bytes):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        # Health and metadata endpoints.
+        self._send(b'{}')
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        # Binary tensors follow the JSON header.
+        header_length = int(self.headers.get('Inference-Header-Content-Length', len(body)))
+        request = json.loads(body[:header_length])
+
+        # Like model instances, at most `max_concurrency` requests are handled at once.
+        with stand_in._slots or contextlib.nullcontext():
+            if stand_in.latency:
+                time.sleep(stand_in.latency)
+
+            outputs = stand_in.respond(request)
+        response = {
+            'model_name': self.path.split('/')[3],
+            'outputs': [{'name': name, 'datatype': np_to_triton_dtype(value.dtype), 'shape': list(value.shape), 'data': value.flatten().tolist()}
+                        for name, value in outputs.items()],
+        }
+
+        with stand_in._lock:
+            stand_in.num_requests += 1
+
+        self._send(json.dumps(response).encode())
+
+class StandInInferenceServer:
+    """Stand-in Triton HTTP server, serving from a background thread. Use as
+    a context manager.
+
+    Args:
+        respond (Optional[Callable[[dict], Dict[str, np.ndarray]]], optional): Outputs for a request header. Defaults to `empty_detections`.
+        latency (float, optional): Seconds to wait before answering a request. Defaults to 0.
+        max_concurrency (Optional[int], optional): Requests handled at once, the others wait. Defaults to None (unbounded).
+        host (str, optional): Defaults to '127.0.0.1'.
+        port (int, optional): Defaults to 0 (any free port).
+    """
+    def __init__(self, respond: Optional[Callable[[dict], Dict[str, np.ndarray]]] = None, latency: float = 0.,
+                 max_concurrency: Optional[int] = None, host: str = '127.0.0.1', port: int = 0):
+        self.respond = respond or empty_detections
+        self.latency = latency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.num_requests = 0
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), _StandInRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -4,8 +4,6 @@ import pathlib
 from typing import Optional
 import urllib.parse
 
-import boto3
-
 class BlobStorage(abc.ABC):
     def __init__(self, *args, **kwargs):
         ...
@@ -20,6 +18,9 @@ class BlobStorage(abc.ABC):
 class S3BlobStorage(BlobStorage):
     def __init__(self, endpoint_url: Optional[str] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # boto3 is slow to import, and only needed once there is something to store.
+        import boto3
+
         self._s3 = boto3.client('s3', endpoint_url=endpoint_url)
 
     def get(self, blob_uri: str, local_path: pathlib.Path):
@@ -1,5 +1,7 @@
 import dataclasses
 import os
+from typing import Optional
+
 import dataclasses_json
 
 @dataclasses_json.dataclass_json
@@ -9,6 +11,19 @@ class InferenceConfig:
     triton_model_name: str
     triton_url: str
     score_threshold: float
+    # Connections kept open to the server per client (and thread).
+    triton_concurrency: int = 1
+    triton_network_timeout: float = 60.
+    # Reuse clients (and their connections) between requests.
+    triton_keepalive: bool = True
+    # Inference backend: 'triton', or 'onnxruntime' to run `onnx_model_path` in-process.
+    backend: str = 'triton'
+    onnx_model_path: Optional[str] = None
+    # onnxruntime CPU threads, 0 lets onnxruntime decide.
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    # 'fp32' (the exported model), or a quantized variant like 'int8-static'.
+    model_variant: str = 'fp32'
 
 
 @dataclasses_json.dataclass_json
@@ -7,7 +7,7 @@ DATA_DIR = BASE_DIR / 'data'
 CONFIG_DIR = BASE_DIR / 'config'
 
 
-LOGGING_CONFIG = {'version': 1, 'formatters': {
+LOGGING_CONFIG = {'version': 1, 'disable_existing_loggers': False, 'formatters': {
     'f': {'format': '[%(levelname)-4s] %(asctime)s %(name)-12s: %(message)s'}
 }, 'handlers': {
     'h': {'class': 'logging.StreamHandler',
@@ -12,13 +12,14 @@ import tempfile
 
 from typing import List, Optional
 
-import pandas as pd
-
 from .constants import *
 
 
 def getLogger(name: str = 'default'):
-    logging_config.dictConfig(LOGGING_CONFIG)
+    # Logging is only configured when nothing else (like the CLI) did, so
+    # modules imported later do not reset it.
+    if not logging.getLogger().handlers:
+        logging_config.dictConfig(LOGGING_CONFIG)
     return logging.getLogger(name)
 
 logger = getLogger('utils')
@@ -115,6 +116,9 @@ class TimeSplitTracker:
             logging.warning('No ticks to summarize.')
             return
 
+        # pandas is only needed for (debug) summaries.
+        import pandas as pd
+
         df = pd.DataFrame(self._ticks)
         ts_diff = df['ts'].diff()
         summary_df = pd.concat([df['description'].iloc[1:], ts_diff], axis=1).dropna()
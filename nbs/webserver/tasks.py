@@ -1,16 +1,19 @@
 import asyncio
+import io
 import logging
 import os
 import pathlib
+import shlex
 import subprocess
 import tempfile
 import threading
 import uuid
 
-from typing import Optional
+from typing import Optional, Tuple
 
 import pydantic
 
+from cli.client import SOCKET_ENV_VAR, run_command
 from webserver.models import Task, TaskRequest, TaskStatus
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,8 @@ class Manager:
         self._concurrency_limit = os.getenv('AUTOTRIM_CONCURRENCY_LIMIT', 2)
         self._tasks = dict()
         self._lock = threading.Lock()
+        # With a daemon (`autotrim.sh serve`), tasks are command lines of the CLI run on it.
+        self._socket_path = os.getenv(SOCKET_ENV_VAR)
     
     def get_active_task_count(self):
         return len(os.listdir(self._tasks_dir))
@@ -59,31 +64,43 @@ class Manager:
         task.save(self._work_dir)
 
         logger.info('Running command: %s, args: %s', task.command, task.args)
+        returncode, stdout, stderr = None, '', ''
 
         try:
-            process = await asyncio.create_subprocess_shell(
-                f'{task.command} {" ".join(task.args)}',
-                cwd=task.working_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-
-            stdout, stderr = await process.communicate()
-
-            if process.returncode != 0:
+            if self._socket_path is None:
+                process = await asyncio.create_subprocess_shell(
+                    f'{task.command} {" ".join(task.args)}',
+                    cwd=task.working_dir,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+
+                stdout, stderr = await process.communicate()
+                returncode, stdout, stderr = process.returncode, stdout.decode(), stderr.decode()
+            else:
+                returncode, stdout, stderr = await self._run_on_daemon(task)
+
+            if returncode != 0:
                 raise ValueError('Non zero exit code.')
 
-            task.update_returncode(process.returncode)
-            task.update_stderr(stderr.decode().strip())
-            task.update_stdout(stdout.decode().strip())
+            task.update_returncode(returncode)
+            task.update_stderr(stderr.strip())
+            task.update_stdout(stdout.strip())
             task.update_status(TaskStatus.SUCCESS)
             task.save(self._work_dir)
         except Exception as e:
             logger.exception('Task ID: %s, exception when running subprocess for command: %s', task.task_id, task.command)
-            task.update_returncode(process.returncode)
-            task.update_stderr(stderr.decode().strip())
-            task.update_stdout(stdout.decode().strip())
+            task.update_returncode(returncode)
+            task.update_stderr(stderr.strip())
+            task.update_stdout(stdout.strip())
             task.update_status(TaskStatus.FAILED)
             task.save(self._work_dir)
         finally:
-            os.rmdir(task.working_dir)
\ No newline at end of file
+            os.rmdir(task.working_dir)
+
+    async def _run_on_daemon(self, task: Task) -> Tuple[int, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        returncode = await asyncio.to_thread(run_command, [*shlex.split(task.command), *task.args], pathlib.Path(self._socket_path),
+                                             pathlib.Path(task.working_dir), stdout, stderr)
+
+        return returncode, stdout.getvalue(), stderr.getvalue()
\ No newline at end of file